@@ -1,125 +1,224 @@
-from flask import Flask, request, jsonify, make_response
+from flask import Flask
 from flask_cors import CORS
-from flask_mail import Message
-
-from src.routes.ads_routes import ads_bp
-from src.routes.auth_routes import auth_bp
-from src.routes.donation_routes import donation_bp
-from src.routes.notifications_routes import notifications_bp
 from src.utils.mail_instance import mail
-from apscheduler.schedulers.background import BackgroundScheduler
-from src.routes.donation_routes import send_expiry_reminders
-from src.routes.ai_routes import ai_bp
-from src.routes.ngodashboard_routes import ngo_dashboard_bp
-from src.routes.auth_routes import profile_bp
+from src.utils.helpers import OrjsonProvider, ojson
 from dotenv import load_dotenv
 from werkzeug.exceptions import HTTPException
+import logging
 import os
-from src.routes.admin_routes import admin_bp
+import tempfile
 
 # Load environment variables
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 load_dotenv(dotenv_path=os.path.join(BASE_DIR, ".env"))
 
-app = Flask(__name__)
-
-# Mail settings
-app.config.update(
-    MAIL_SERVER=os.getenv("MAIL_SERVER", "smtp.gmail.com"),
-    MAIL_PORT=int(os.getenv("MAIL_PORT", 587)),
-    MAIL_USE_TLS=os.getenv("MAIL_USE_TLS", "True").lower() == "true",
-    MAIL_USERNAME=os.getenv("MAIL_USERNAME"),
-    MAIL_PASSWORD=os.getenv("MAIL_PASSWORD"),
-    MAIL_DEFAULT_SENDER=os.getenv("MAIL_DEFAULT_SENDER", os.getenv("MAIL_USERNAME")),
-)
-
-mail.init_app(app)
+# Snapshot of the environment; settings are parsed once per process
+_ENV = os.environ
+_MAIL_PORT = int(_ENV.get("MAIL_PORT", "587"))
+_MAIL_MAX_EMAILS = int(_ENV.get("MAIL_MAX_EMAILS", "100"))
 
-# Allowed frontend origins
-ALLOWED_ORIGINS = [
+# Allowed frontend origins (tuple for Flask-CORS, frozenset for per-request lookups)
+ALLOWED_ORIGINS_LIST = (
     "http://127.0.0.1:3000",
     "http://localhost:3000",
     "http://localhost:3001",
     "http://192.168.56.1:3001",
-]
-
-CORS(
-    app,
-    resources={r"/api/*": {"origins": ALLOWED_ORIGINS}},
-    supports_credentials=True,
-    allow_headers=["Content-Type", "Authorization", "X-Requested-With"],
-    methods=["GET", "POST", "OPTIONS", "PUT", "DELETE", "PATCH"],
 )
+ALLOWED_ORIGINS = frozenset(ALLOWED_ORIGINS_LIST)
+
+# How long browsers may cache a preflight result (Chromium caps this at 7200s)
+CORS_MAX_AGE = int(_ENV.get("CORS_MAX_AGE", "86400"))
+
+# Preflight headers that never vary per request; only Allow-Origin is dynamic
+STATIC_CORS_HEADERS = (
+    ("Access-Control-Allow-Credentials", "true"),
+    ("Access-Control-Allow-Headers", "Content-Type,Authorization,X-Requested-With"),
+    ("Access-Control-Allow-Methods", "GET,POST,OPTIONS,PUT,DELETE,PATCH"),
+    ("Access-Control-Max-Age", str(CORS_MAX_AGE)),
+    ("Vary", "Origin"),
+)
+_PREFLIGHT_WSGI_HEADERS = list(STATIC_CORS_HEADERS) + [("Content-Length", "0")]
+
+
+class PreflightShortcut:
+    """
+    WSGI middleware that answers CORS preflights for allowed origins before
+    Flask does URL matching, blueprint dispatch or any before_request hooks.
+    """
+
+    def __init__(self, wsgi_app):
+        self.wsgi_app = wsgi_app
+
+    def __call__(self, environ, start_response):
+        if environ.get("REQUEST_METHOD") == "OPTIONS" and environ.get("PATH_INFO", "").startswith("/api/"):
+            origin = environ.get("HTTP_ORIGIN", "")
+            if origin in ALLOWED_ORIGINS:
+                start_response(
+                    "204 No Content",
+                    [("Access-Control-Allow-Origin", origin)] + _PREFLIGHT_WSGI_HEADERS,
+                )
+                return [b""]
+        return self.wsgi_app(environ, start_response)
+
+
+def create_app():
+    """
+    Build the Flask app. Blueprints are imported here rather than at module
+    import so worker start-up only pays for them when an app is created
+    (run gunicorn with --preload to share the loaded modules across workers).
+    """
+    # Configure logging once per process (no-op if a handler already exists)
+    logging.basicConfig(
+        level=_ENV.get("LOG_LEVEL", "INFO"),
+        format="%(asctime)s | %(levelname)s | %(message)s"
+    )
+
+    app = Flask(__name__)
+    app.json = OrjsonProvider(app)
+
+    # Mail settings
+    app.config.update(
+        MAIL_SERVER=_ENV.get("MAIL_SERVER", "smtp.gmail.com"),
+        MAIL_PORT=_MAIL_PORT,
+        MAIL_USE_TLS=_ENV.get("MAIL_USE_TLS", "True").lower() == "true",
+        MAIL_USERNAME=_ENV.get("MAIL_USERNAME"),
+        MAIL_PASSWORD=_ENV.get("MAIL_PASSWORD"),
+        MAIL_DEFAULT_SENDER=_ENV.get("MAIL_DEFAULT_SENDER", _ENV.get("MAIL_USERNAME")),
+        # Emails sent per SMTP connection before Flask-Mail reconnects
+        MAIL_MAX_EMAILS=_MAIL_MAX_EMAILS,
+    )
+
+    mail.init_app(app)
+
+    CORS(
+        app,
+        resources={r"/api/*": {"origins": list(ALLOWED_ORIGINS_LIST)}},
+        supports_credentials=True,
+        allow_headers=["Content-Type", "Authorization", "X-Requested-With"],
+        methods=["GET", "POST", "OPTIONS", "PUT", "DELETE", "PATCH"],
+        max_age=CORS_MAX_AGE,
+    )
+
+    app.wsgi_app = PreflightShortcut(app.wsgi_app)
+
+    # Basic error handler
+    # CORS headers are added by Flask-CORS's after_request hook, which also runs
+    # for responses produced by error handlers.
+    @app.errorhandler(Exception)
+    def handle_exception(e):
+        if isinstance(e, HTTPException):
+            return e
+
+        return ojson({"error": str(e)}, 500)
+
+    # Routes
+    from src.routes.auth_routes import auth_bp, profile_bp
+    from src.routes.donation_routes import donation_bp
+    from src.routes.notifications_routes import notifications_bp
+    from src.routes.ai_routes import ai_bp
+    from src.routes.ngodashboard_routes import ngo_dashboard_bp
+    from src.routes.admin_routes import admin_bp
+    from src.routes.ads_routes import ads_bp
+
+    app.register_blueprint(auth_bp, url_prefix="/api")
+    app.register_blueprint(donation_bp, url_prefix="/api")
+    app.register_blueprint(notifications_bp, url_prefix="/api")
+    app.register_blueprint(ai_bp, url_prefix="/api")
+    app.register_blueprint(ngo_dashboard_bp, url_prefix="/api")
+    app.register_blueprint(profile_bp, url_prefix="/api")
+    app.register_blueprint(admin_bp, url_prefix="/api")
+    app.register_blueprint(ads_bp, url_prefix="/api")
+
+    @app.route("/")
+    def home():
+        return ojson({"message": "FoodShare backend is running."})
+
+    if _ENV.get("RUN_SCHEDULER") == "1":
+        start_scheduler(app)
+
+    return app
 
-# Handle preflight requests
-@app.before_request
-def handle_preflight():
-    if request.method == "OPTIONS":
-        origin = request.headers.get("Origin", "")
-        if origin in ALLOWED_ORIGINS:
-            response = make_response()
-            response.headers["Access-Control-Allow-Origin"] = origin
-            response.headers["Access-Control-Allow-Methods"] = "GET,POST,OPTIONS,PUT,DELETE,PATCH"
-            response.headers["Access-Control-Allow-Headers"] = "Content-Type,Authorization,X-Requested-With"
-            response.headers["Access-Control-Allow-Credentials"] = "true"
-            response.status_code = 200
-            return response
-    return None
-
-# Add CORS headers to responses
-@app.after_request
-def add_cors_headers(response):
-    origin = request.headers.get("Origin")
-    if origin in ALLOWED_ORIGINS:
-        response.headers["Access-Control-Allow-Origin"] = origin
-    response.headers["Access-Control-Allow-Credentials"] = "true"
-    response.headers["Access-Control-Allow-Headers"] = "Content-Type,Authorization,X-Requested-With"
-    response.headers["Access-Control-Allow-Methods"] = "GET,POST,OPTIONS,PUT,DELETE,PATCH"
-    return response
-
-# Basic error handler
-@app.errorhandler(Exception)
-def handle_exception(e):
-    if isinstance(e, HTTPException):
-        return e
-
-    origin = request.headers.get("Origin")
-    response = jsonify({"error": str(e)})
-
-    if origin in ALLOWED_ORIGINS:
-        response.headers["Access-Control-Allow-Origin"] = origin
-
-    response.headers["Access-Control-Allow-Credentials"] = "true"
-    response.headers["Access-Control-Allow-Headers"] = "Content-Type,Authorization,X-Requested-With"
-    response.headers["Access-Control-Allow-Methods"] = "GET,POST,OPTIONS,PUT,DELETE,PATCH"
-    response.status_code = 500
-
-    return response
-
-# Routes
-app.register_blueprint(auth_bp, url_prefix="/api")
-app.register_blueprint(donation_bp, url_prefix="/api")
-app.register_blueprint(notifications_bp, url_prefix="/api")
-app.register_blueprint(ai_bp, url_prefix="/api")
-app.register_blueprint(ngo_dashboard_bp, url_prefix="/api")
-app.register_blueprint(profile_bp, url_prefix="/api")
-app.register_blueprint(admin_bp, url_prefix="/api")
-app.register_blueprint(ads_bp, url_prefix="/api")
-
-
-@app.route("/")
-def home():
-    return jsonify({"message": "FoodShare backend is running."})
 
 # Reminder job
-def start_scheduler():
-    scheduler = BackgroundScheduler()
-    scheduler.add_job(send_expiry_reminders, "interval", hours=24)
+scheduler = None
+_scheduler_lock_file = None
+
+
+def _expiry_reminder_job(app):
+    from src.routes.donation_routes import run_expiry_reminders
+
+    with app.app_context():
+        run_expiry_reminders()
+
+
+def _acquire_scheduler_lock():
+    """
+    Take an exclusive, non-blocking lock on SCHEDULER_LOCK_FILE and keep it
+    for the life of the process. RUN_SCHEDULER=1 is seen by every gunicorn
+    worker in the container; only the worker holding this lock schedules,
+    and when it exits the lock passes to the next worker that starts.
+    """
+    global _scheduler_lock_file
+    try:
+        import fcntl
+    except ImportError:
+        # No flock (Windows dev server): single process, nothing to share
+        return True
+
+    path = _ENV.get(
+        "SCHEDULER_LOCK_FILE",
+        os.path.join(tempfile.gettempdir(), "foodshare-scheduler.lock"),
+    )
+    lock_file = open(path, "a")
+    try:
+        fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except OSError:
+        lock_file.close()
+        return False
+
+    _scheduler_lock_file = lock_file
+    return True
+
+
+def start_scheduler(app):
+    """
+    Start the reminder scheduler once per container. Every gunicorn worker
+    created with RUN_SCHEDULER=1 calls this, but only the one that wins the
+    scheduler file lock starts it, so each reminder is sent once. The lock
+    is per host: set RUN_SCHEDULER=1 on a single container/replica.
+    """
+    from apscheduler.executors.pool import ThreadPoolExecutor
+    from apscheduler.schedulers.background import BackgroundScheduler
+    from apscheduler.triggers.cron import CronTrigger
+
+    global scheduler
+    if scheduler is not None:
+        return scheduler
+
+    if not _acquire_scheduler_lock():
+        return None
+
+    scheduler = BackgroundScheduler(executors={"default": ThreadPoolExecutor(2)})
+    scheduler.add_job(
+        _expiry_reminder_job,
+        # Fixed off-peak slot instead of "24h after boot"; jitter spreads
+        # instances that restart together
+        CronTrigger(hour=3, minute=0, jitter=60),
+        args=[app],
+        max_instances=1,
+        coalesce=True,
+        misfire_grace_time=3600,
+    )
     scheduler.start()
     print("Reminder scheduler started.")
+    return scheduler
 
 
+# Local development only; production runs under gunicorn (see Dockerfile)
 if __name__ == "__main__":
+    app = create_app()
+    start_scheduler(app)
+
     print("Registered routes:")
     for rule in app.url_map.iter_rules():
         print(rule)
@@ -127,6 +226,7 @@ if __name__ == "__main__":
     app.run(
         host="0.0.0.0",
         port=5050,
-        debug=True,
-        use_reloader=False
+        debug=_ENV.get("FLASK_DEV") == "1",
+        use_reloader=False,
+        threaded=True
     )
@@ -3,26 +3,29 @@ Admin Routes for FoodShare Platform
 Handles admin-specific operations like NGO verification, user management, and system reports.
 """
 
-from flask import Blueprint, request, jsonify, Response
+from flask import Blueprint, request, jsonify, Response, render_template, stream_with_context, g
 from werkzeug.security import generate_password_hash
 from src.services.supabase_service import supabase
+from postgrest.exceptions import APIError
 from src.utils.jwt import decode_request_token
 from flask_mail import Message
-from src.utils.mail_instance import mail
-import traceback
+from src.utils.mail_queue import send_async
 import logging
-from datetime import datetime, timedelta, date
+from datetime import datetime, timedelta, date, timezone
 import csv
 import io
 import time
 import json
 import textwrap
+from functools import lru_cache
+from types import MappingProxyType
+import orjson
+from collections import Counter
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from cachetools import TTLCache
 from src.utils.audit_log import log_audit
-
-logging.basicConfig(
-    level=logging.INFO,
-    format="%(asctime)s | %(levelname)s | %(message)s"
-)
+from src.utils.helpers import ojson, raw_json, utc_now_iso
 
 logger = logging.getLogger(__name__)
 
@@ -53,6 +56,17 @@ def execute_with_retry(factory, retries: int = 2, delay_seconds: float = 0.35):
     raise last_exc
 
 
+# Shared pool for report queries that do not depend on each other, so a
+# report waits for the slowest query instead of the sum of all of them
+_report_executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix="report")
+
+
+def _fetch_in_parallel(*factories):
+    """Run execute_with_retry for each query factory concurrently; return results in order."""
+    futures = [_report_executor.submit(execute_with_retry, f) for f in factories]
+    return [f.result() for f in futures]
+
+
 def _apply_audit_filters(
     query,
     action: str | None,
@@ -164,7 +178,7 @@ def _activity_level_from(last_activity: datetime | None, total_actions: int) ->
     if total_actions <= 0 or last_activity is None:
         return "Inactive"
 
-    days_since = (datetime.utcnow() - _normalize_utc_naive(last_activity)).days
+    days_since = (_normalize_utc_naive(datetime.now(timezone.utc)) - _normalize_utc_naive(last_activity)).days
     if days_since <= 7:
         return "Highly Active"
     if days_since <= 30:
@@ -173,18 +187,15 @@ def _activity_level_from(last_activity: datetime | None, total_actions: int) ->
 
 
 def _build_user_activity_report():
-    users_res = execute_with_retry(
+    users_res, audit_res = _fetch_in_parallel(
         lambda: supabase.table("users")
         .select("id, full_name, email, role, status, created_at")
-        .order("created_at", desc=True)
-    )
-    users = users_res.data or []
-
-    audit_res = execute_with_retry(
+        .order("created_at", desc=True),
         lambda: supabase.table("audit_logs")
         .select("user_id, action, created_at")
-        .order("created_at", desc=True)
+        .order("created_at", desc=True),
     )
+    users = users_res.data or []
     audit_logs = audit_res.data or []
 
     activity_map = {}
@@ -244,7 +255,7 @@ def _build_user_activity_report():
 
 
 def _build_new_registrations_report(days: int = 30):
-    start_date = (datetime.utcnow() - timedelta(days=days)).isoformat()
+    start_date = (datetime.now(timezone.utc) - timedelta(days=days)).isoformat()
     users_res = execute_with_retry(
         lambda: supabase.table("users")
         .select("id, full_name, email, phone, role, status, created_at")
@@ -297,6 +308,136 @@ def _build_user_roles_distribution_report():
     return report_rows
 
 
+# Impact report conversion factors (read-only, built once at import)
+PIECE_TO_KG = MappingProxyType({"Fruits": 0.18, "Vegetables": 0.25, "Meat": 0.30, "Dairy": 0.50, "Grains": 0.40, "Prepared Food": 0.40})
+UNIT_TO_KG = MappingProxyType({"kg": 1.0, "liters": 1.0, "boxes": 5.0})
+DEFAULT_PIECE_KG = 0.25
+
+# Piece weights keyed by both the display name and the stored category slug
+# ("Prepared Food" / "prepared_food") so each row is a single lookup
+_PIECE_FACTORS = MappingProxyType({
+    **PIECE_TO_KG,
+    **{name.lower().replace(" ", "_"): kg for name, kg in PIECE_TO_KG.items()},
+})
+
+
+# Environmental impact estimates per kg of food saved
+CO2_KG_PER_FOOD_KG = 2.5       # ~2.5kg CO2 per kg food waste
+WATER_L_PER_FOOD_KG = 1000.0   # ~1000L water per kg food
+
+
+@lru_cache(maxsize=1024)
+def _kg_factor(unit: str | None, category: str | None) -> float:
+    """kg per unit of quantity; depends only on (unit, category), so memoized."""
+    unit = (unit or "").lower()
+    if unit == "pieces":
+        return _PIECE_FACTORS.get(category, DEFAULT_PIECE_KG)
+    return UNIT_TO_KG.get(unit, 0.0)
+
+
+def _impact_totals(claims, donations_map):
+    """
+    Total food saved (kg) and per-category breakdown for completed claims,
+    computed in one pass with a memoized factor per (unit, category).
+    """
+    kg_factor = _kg_factor
+
+    total_food_kg = 0.0
+    category_breakdown = {}
+    for c in claims:
+        donation = donations_map.get(c.get("donation_id"))
+        if not donation:
+            continue
+
+        try:
+            qty = float(donation.get("quantity", 0))
+        except (TypeError, ValueError):
+            qty = 0.0
+
+        kg = qty * kg_factor(donation.get("unit"), donation.get("category"))
+        total_food_kg += kg
+        cat = donation.get("category", "Other")
+        category_breakdown[cat] = category_breakdown.get(cat, 0) + kg
+
+    return total_food_kg, category_breakdown
+
+
+def _impact_totals_fallback():
+    """Python-side impact metrics, used when the report RPC is unavailable."""
+    claims_res = execute_with_retry(
+        lambda: supabase.table("ngo_claims")
+        .select("donation_id")
+        .eq("status", "completed")
+    )
+    claims = claims_res.data or []
+    donation_ids = list({c["donation_id"] for c in claims if c.get("donation_id")})
+
+    donations_map = {}
+    if donation_ids:
+        donations_res = execute_with_retry(
+            lambda: supabase.table("food_donations")
+            .select("id, quantity, unit, category")
+            .in_("id", donation_ids)
+        )
+        donations_map = {d["id"]: d for d in (donations_res.data or [])}
+
+    total_food_kg, category_breakdown = _impact_totals(claims, donations_map)
+    return {
+        "metrics": {
+            "total_food_saved_kg": round(total_food_kg, 2),
+            "co2_avoided_kg": round(total_food_kg * CO2_KG_PER_FOOD_KG, 2),
+            "water_saved_liters": round(total_food_kg * WATER_L_PER_FOOD_KG, 2),
+            "completed_donations": len(claims),
+        },
+        "category_breakdown": {
+            k: round(v, 2) for k, v in category_breakdown.items()
+        },
+    }
+
+
+def _build_impact_report():
+    """
+    Impact metrics aggregated in Postgres by report_impact_totals() (see
+    supabase/migrations/*_report_impact_totals.sql).
+    """
+    try:
+        impact_res = execute_with_retry(lambda: supabase.rpc("report_impact_totals"))
+        totals = impact_res.data or {}
+    except Exception:
+        logger.exception("report_impact_totals RPC failed, computing in Python")
+        return _impact_totals_fallback()
+
+    return {
+        "metrics": {
+            "total_food_saved_kg": float(totals.get("total_food_saved_kg") or 0),
+            "co2_avoided_kg": float(totals.get("co2_avoided_kg") or 0),
+            "water_saved_liters": float(totals.get("water_saved_liters") or 0),
+            "completed_donations": int(totals.get("completed_donations") or 0),
+        },
+        "category_breakdown": {
+            k: float(v or 0) for k, v in (totals.get("category_breakdown") or {}).items()
+        },
+    }
+
+
+def _queue_notification(row: dict):
+    """Defer an in-app notification insert to the end of the request."""
+    pending = g.setdefault("pending_notifications", [])
+    pending.append(row)
+
+
+@admin_bp.after_request
+def _flush_notifications(response):
+    # One bulk insert for every notification queued during the request
+    pending = g.pop("pending_notifications", None)
+    if pending:
+        try:
+            supabase.table("notifications").insert(pending).execute()
+        except Exception:
+            logger.exception("Failed to insert %d queued notifications", len(pending))
+    return response
+
+
 # ADMIN AUTH MIDDLEWARE
 def require_admin(f):
     """Decorator to protect admin-only routes"""
@@ -322,7 +463,7 @@ def require_admin(f):
             request.admin_email = payload.get("email")
 
         except Exception as e:
-            logger.error(f"Admin auth error: {e}")
+            logger.error("Admin auth error: %s", e)
             return jsonify({"error": "Authentication failed"}), 401
 
         return f(*args, **kwargs)
@@ -330,71 +471,98 @@ def require_admin(f):
     return decorated
 
 
-# GET ADMIN DASHBOARD STATS
-# GET /api/admin/stats
-@admin_bp.route("/admin/stats", methods=["GET"])
-@require_admin
-def get_admin_stats():
+# Counter columns returned by the admin_dashboard_stats() RPC
+ADMIN_STATS_KEYS = (
+    "total_users",
+    "active_users",
+    "donors",
+    "ngos",
+    "pending_ngos",
+    "total_donations",
+    "available_donations",
+    "claimed_donations",
+    "completed_donations",
+    "total_claims",
+    "completed_claims",
+)
+
+
+# Dashboard counters are shared by every admin; keep them for a short window
+ADMIN_STATS_CACHE_KEY = "admin_stats"
+_admin_stats_cache = TTLCache(maxsize=1, ttl=60)
+_admin_stats_lock = threading.Lock()
+
+
+def _compute_stats():
+    # Single-row read from the admin_stats_mv materialized view (see
+    # supabase/migrations/*_admin_stats_mv.sql)
+    stats_res = execute_with_retry(
+        lambda: supabase.rpc("admin_dashboard_stats")
+    )
+    rows = stats_res.data or []
+    stats = rows[0] if rows else {}
+    return {key: int(stats.get(key) or 0) for key in ADMIN_STATS_KEYS}
+
+
+def _get_cached_stats():
+    with _admin_stats_lock:
+        stats = _admin_stats_cache.get(ADMIN_STATS_CACHE_KEY)
+        if stats is None:
+            stats = _compute_stats()
+            _admin_stats_cache[ADMIN_STATS_CACHE_KEY] = stats
+        return stats
+
+
+def _refresh_admin_stats():
     """
-    Fetch platform-wide statistics for admin dashboard
+    Refresh the admin_stats_mv materialized view and drop this worker's
+    cached copy. Best effort: where pg_cron is installed it also refreshes
+    the view every minute, and admin_dashboard_stats() falls back to live
+    counts once the view is more than two minutes old.
     """
     try:
-        # Total users count
-        users_res = execute_with_retry(
-            lambda: supabase.table("users").select("id, role, status")
-        )
-        users = users_res.data or []
+        supabase.rpc("refresh_admin_stats").execute()
+    except Exception:
+        logger.exception("Admin stats refresh failed")
+    with _admin_stats_lock:
+        _admin_stats_cache.pop(ADMIN_STATS_CACHE_KEY, None)
 
-        total_users = len(users)
-        active_users = len([u for u in users if u.get("status") == "active"])
-        donors = len([u for u in users if u.get("role") == "donor"])
-        ngos = len([u for u in users if u.get("role") == "ngo"])
 
-        # Pending NGOs (users with role=ngo but pending organization verification)
-        pending_orgs_res = execute_with_retry(
-            lambda: supabase.table("organizations")
-            .select("id")
-            .eq("verification_status", "pending")
-        )
-        pending_ngos = len(pending_orgs_res.data or [])
+_stats_refresh_pending = threading.Event()
 
-        # Total donations
-        donations_res = execute_with_retry(
-            lambda: supabase.table("food_donations").select("id, status")
-        )
-        donations = donations_res.data or []
 
-        total_donations = len(donations)
-        available_donations = len([d for d in donations if d.get("status") == "available"])
-        claimed_donations = len([d for d in donations if d.get("status") == "claimed"])
-        completed_donations = len([d for d in donations if d.get("status") == "completed"])
+def _run_queued_stats_refresh():
+    _stats_refresh_pending.clear()
+    _refresh_admin_stats()
 
-        # Claims count
-        claims_res = execute_with_retry(
-            lambda: supabase.table("ngo_claims").select("id, status")
-        )
-        claims = claims_res.data or []
 
-        total_claims = len(claims)
-        completed_claims = len([c for c in claims if c.get("status") == "completed"])
+def _queue_admin_stats_refresh():
+    """
+    Refresh the stats view on the report pool so NGO review requests do not
+    wait on it; reviews arriving while a refresh is queued share it.
+    """
+    if _stats_refresh_pending.is_set():
+        return
+    _stats_refresh_pending.set()
+    _report_executor.submit(_run_queued_stats_refresh)
 
-        return jsonify({
-            "total_users": total_users,
-            "active_users": active_users,
-            "donors": donors,
-            "ngos": ngos,
-            "pending_ngos": pending_ngos,
-            "total_donations": total_donations,
-            "available_donations": available_donations,
-            "claimed_donations": claimed_donations,
-            "completed_donations": completed_donations,
-            "total_claims": total_claims,
-            "completed_claims": completed_claims,
-        }), 200
+
+# GET ADMIN DASHBOARD STATS
+# GET /api/admin/stats?refresh=1
+@admin_bp.route("/admin/stats", methods=["GET"])
+@require_admin
+def get_admin_stats():
+    """
+    Fetch platform-wide statistics for admin dashboard
+    (cached for 60s; pass ?refresh=1 to refresh the view and recompute)
+    """
+    try:
+        if request.args.get("refresh") == "1":
+            _refresh_admin_stats()
+        return jsonify(_get_cached_stats()), 200
 
     except Exception as e:
         logger.exception("Admin stats error")
-        traceback.print_exc()
         return jsonify({"error": str(e)}), 500
 
 
@@ -419,7 +587,7 @@ def get_pending_ngos():
         pending_orgs = orgs_res.data or []
 
         if not pending_orgs:
-            return jsonify([]), 200
+            return ojson([])
 
         # Fetch associated user data
         user_ids = [org["user_id"] for org in pending_orgs if org.get("user_id")]
@@ -434,11 +602,9 @@ def get_pending_ngos():
             )
             users_map = {u["id"]: u for u in (users_res.data or [])}
 
-        # Merge data
-        result = []
-        for org in pending_orgs:
-            user = users_map.get(org.get("user_id"), {})
-            result.append({
+        # Merge data (user bound once per org)
+        result = [
+            {
                 "user_id": user.get("id"),
                 "org_id": org.get("id"),
                 "full_name": org.get("name") or user.get("full_name"),
@@ -448,13 +614,15 @@ def get_pending_ngos():
                 "description": org.get("description"),
                 "status": org.get("verification_status"),
                 "created_at": org.get("created_at") or user.get("created_at"),
-            })
+            }
+            for org in pending_orgs
+            for user in (users_map.get(org.get("user_id")) or {},)
+        ]
 
-        return jsonify(result), 200
+        return ojson(result)
 
     except Exception as e:
         logger.exception("Get pending NGOs error")
-        traceback.print_exc()
         return jsonify({"error": str(e)}), 500
 
 
@@ -467,52 +635,19 @@ def approve_ngo(user_id):
     Approve an NGO application and send confirmation email
     """
     try:
-        now = datetime.utcnow().isoformat()
-
-        # . Fetch user
-        user_res = (
-            supabase.table("users")
-            .select("id, email, full_name, status")
-            .eq("id", user_id)
-            .single()
-            .execute()
-        )
+        # . Verify organization, activate user and notify in one transaction
+        #   (see supabase/migrations/*_ngo_review_rpcs.sql)
+        review_res = supabase.rpc("approve_ngo", {"p_user_id": user_id}).execute()
+        review = (review_res.data or [{}])[0]
 
-        if not user_res.data:
+        if review.get("result") == "user_not_found":
             return jsonify({"error": "User not found"}), 404
 
-        user = user_res.data
-
-        # . Update organization verification status
-        org_update = (
-            supabase.table("organizations")
-            .update({
-                "verification_status": "approved",
-            })
-            .eq("user_id", user_id)
-            .execute()
-        )
-
-        if not org_update.data:
+        if review.get("result") == "org_not_found":
             return jsonify({"error": "Organization not found"}), 404
 
-        # . Ensure user status is active
-        supabase.table("users").update({
-            "status": "active",
-        }).eq("id", user_id).execute()
-
-        # . Create notification
-        supabase.table("notifications").insert({
-            "user_id": user_id,
-            "title": "NGO Application Approved",
-            "message": (
-                "Congratulations! Your organization has been verified. "
-                "You can now claim food donations on the platform."
-            ),
-            "type": "status_update",
-            "read": False,
-            "created_at": now,
-        }).execute()
+        user = review
+        _queue_admin_stats_refresh()
 
         # . Send approval email
         try:
@@ -520,28 +655,15 @@ def approve_ngo(user_id):
                 subject="Your NGO Application Has Been Approved - FoodShare",
                 recipients=[user.get("email")],
             )
-            msg.body = f"""
-Hello {user.get("full_name", "NGO Partner")},
-
-Great news! Your organization has been verified and approved on FoodShare.
-
-You can now:
-- Browse available food donations
-- Claim donations for pickup
-- Track your impact and analytics
-
-Log in to your dashboard to start making a difference!
-
-Thank you for joining FoodShare in the fight against food waste.
-
-Warm regards,
-The FoodShare Team
-"""
-            mail.send(msg)
-            logger.info(f"Approval email sent to {user.get('email')}")
+            msg.body = render_template(
+                "email/ngo_approved.txt",
+                name=user.get("full_name", "NGO Partner"),
+            )
+            send_async(msg)
+            logger.info("Approval email queued for %s", user.get("email"))
 
         except Exception as email_err:
-            logger.error(f"Failed to send approval email: {email_err}")
+            logger.error("Failed to send approval email: %s", email_err)
 
         log_audit(
             "ngo_approved",
@@ -559,7 +681,6 @@ The FoodShare Team
 
     except Exception as e:
         logger.exception("Approve NGO error")
-        traceback.print_exc()
         return jsonify({"error": str(e)}), 500
 
 
@@ -575,49 +696,21 @@ def reject_ngo(user_id):
         data = request.get_json() or {}
         reason = data.get("reason", "Your application did not meet our verification criteria.")
 
-        now = datetime.utcnow().isoformat()
-
-        # . Fetch user
-        user_res = (
-            supabase.table("users")
-            .select("id, email, full_name")
-            .eq("id", user_id)
-            .single()
-            .execute()
-        )
+        # . Reject organization, update user and notify in one transaction
+        #   (see supabase/migrations/*_ngo_review_rpcs.sql)
+        review_res = supabase.rpc(
+            "reject_ngo", {"p_user_id": user_id, "p_reason": reason}
+        ).execute()
+        review = (review_res.data or [{}])[0]
 
-        if not user_res.data:
+        if review.get("result") == "user_not_found":
             return jsonify({"error": "User not found"}), 404
 
-        user = user_res.data
-
-        # . Update organization verification status
-        org_update = (
-            supabase.table("organizations")
-            .update({
-                "verification_status": "rejected",
-            })
-            .eq("user_id", user_id)
-            .execute()
-        )
-
-        if not org_update.data:
+        if review.get("result") == "org_not_found":
             return jsonify({"error": "Organization not found"}), 404
 
-        # . Update user status
-        supabase.table("users").update({
-            "status": "rejected",
-        }).eq("id", user_id).execute()
-
-        # . Create notification
-        supabase.table("notifications").insert({
-            "user_id": user_id,
-            "title": "NGO Application Not Approved",
-            "message": f"Unfortunately, your application was not approved. Reason: {reason}",
-            "type": "status_update",
-            "read": False,
-            "created_at": now,
-        }).execute()
+        user = review
+        _queue_admin_stats_refresh()
 
         # . Send rejection email
         try:
@@ -625,29 +718,16 @@ def reject_ngo(user_id):
                 subject="Update on Your NGO Application - FoodShare",
                 recipients=[user.get("email")],
             )
-            msg.body = f"""
-Hello {user.get("full_name", "Applicant")},
-
-Thank you for your interest in joining FoodShare.
-
-After reviewing your application, we regret to inform you that your organization 
-has not been approved at this time.
-
-Reason: {reason}
-
-If you believe this decision was made in error or would like to provide additional 
-documentation, please contact our support team.
-
-Thank you for your understanding.
-
-Warm regards,
-The FoodShare Team
-"""
-            mail.send(msg)
-            logger.info(f"Rejection email sent to {user.get('email')}")
+            msg.body = render_template(
+                "email/ngo_rejected.txt",
+                name=user.get("full_name", "Applicant"),
+                reason=reason,
+            )
+            send_async(msg)
+            logger.info("Rejection email queued for %s", user.get("email"))
 
         except Exception as email_err:
-            logger.error(f"Failed to send rejection email: {email_err}")
+            logger.error("Failed to send rejection email: %s", email_err)
 
         log_audit(
             "ngo_rejected",
@@ -665,10 +745,24 @@ The FoodShare Team
 
     except Exception as e:
         logger.exception("Reject NGO error")
-        traceback.print_exc()
         return jsonify({"error": str(e)}), 500
 
 
+# LIKE metacharacters, escaped so a search matches them literally
+_LIKE_ESCAPES = str.maketrans({"\\": "\\\\", "%": "\\%", "_": "\\_"})
+
+
+def _sanitize_search_term(search: str | None) -> str:
+    """
+    Search text for an ilike pattern inside a PostgREST or=() filter: drop
+    characters that would break the filter and escape LIKE wildcards.
+    """
+    if not search:
+        return ""
+    term = "".join(ch for ch in search.strip() if ch not in ',()"*')
+    return term.translate(_LIKE_ESCAPES)
+
+
 # GET ALL USERS
 # GET /api/admin/users
 @admin_bp.route("/admin/users", methods=["GET"])
@@ -682,13 +776,14 @@ def get_all_users():
         role = request.args.get("role")
         status = request.args.get("status")
         search = request.args.get("search")
-        page = int(request.args.get("page", 1))
-        limit = int(request.args.get("limit", 50))
+        page = max(int(request.args.get("page", 1)), 1)
+        limit = min(max(int(request.args.get("limit", 50)), 1), 100)
         offset = (page - 1) * limit
 
-        # Build query
+        # Build query (count="exact" returns the filtered total with the page)
         query = supabase.table("users").select(
-            "id, full_name, email, phone, role, status, created_at"
+            "id, full_name, email, phone, role, status, created_at",
+            count="exact",
         )
 
         if role and role != "all":
@@ -697,50 +792,43 @@ def get_all_users():
         if status and status != "all":
             query = query.eq("status", status)
 
-        query = query.order("created_at", desc=True)
+        # Substring search on name/email (pg_trgm indexes back these ILIKEs)
+        term = _sanitize_search_term(search)
+        if term:
+            query = query.or_(f"full_name.ilike.*{term}*,email.ilike.*{term}*")
+
+        query = query.order("created_at", desc=True).range(offset, offset + limit - 1)
 
         # Execute query
         users_res = execute_with_retry(lambda: query)
         users = users_res.data or []
-
-        # Filter by search term (client-side for now)
-        if search:
-            search_lower = search.lower()
-            users = [
-                u for u in users
-                if search_lower in (u.get("full_name") or "").lower()
-                or search_lower in (u.get("email") or "").lower()
-            ]
+        total = users_res.count or 0
 
         # Get donation/claim counts for each user
         user_ids = [u["id"] for u in users]
 
-        # Donation counts
+        # Donation counts (grouped in Postgres, one row per donor)
         donations_map = {}
         if user_ids:
             donations_res = execute_with_retry(
-                lambda: supabase.table("food_donations")
-                .select("donor_id")
-                .in_("donor_id", user_ids)
+                lambda: supabase.rpc("user_donation_counts", {"user_ids": user_ids})
             )
-            for d in (donations_res.data or []):
-                donor_id = d.get("donor_id")
-                if donor_id:
-                    donations_map[donor_id] = donations_map.get(donor_id, 0) + 1
+            donations_map = {
+                row["donor_id"]: row["donation_count"]
+                for row in (donations_res.data or [])
+            }
 
         # Claim counts (for NGOs)
         claims_map = {}
         ngo_ids = [u["id"] for u in users if u.get("role") == "ngo"]
         if ngo_ids:
             claims_res = execute_with_retry(
-                lambda: supabase.table("ngo_claims")
-                .select("ngo_id")
-                .in_("ngo_id", ngo_ids)
+                lambda: supabase.rpc("user_claim_counts", {"ngo_ids": ngo_ids})
             )
-            for c in (claims_res.data or []):
-                ngo_id = c.get("ngo_id")
-                if ngo_id:
-                    claims_map[ngo_id] = claims_map.get(ngo_id, 0) + 1
+            claims_map = {
+                row["ngo_id"]: row["claim_count"]
+                for row in (claims_res.data or [])
+            }
 
         # Enrich user data
         enriched_users = []
@@ -758,21 +846,16 @@ def get_all_users():
                 "claims_count": claims_map.get(u["id"], 0),
             })
 
-        # Apply pagination
-        total = len(enriched_users)
-        paginated = enriched_users[offset:offset + limit]
-
-        return jsonify({
-            "users": paginated,
+        return ojson({
+            "users": enriched_users,
             "total": total,
             "page": page,
             "limit": limit,
             "pages": (total + limit - 1) // limit,
-        }), 200
+        })
 
     except Exception as e:
         logger.exception("Get all users error")
-        traceback.print_exc()
         return jsonify({"error": str(e)}), 500
 
 
@@ -923,7 +1006,7 @@ def export_audit_logs():
         )
 
         story = []
-        generated_at = datetime.utcnow().strftime("%Y-%m-%d %H:%M:%S")
+        generated_at = datetime.now(timezone.utc).strftime("%Y-%m-%d %H:%M:%S")
 
         top_bar = Table([[""]], colWidths=[277 * mm], rowHeights=[3 * mm])
         top_bar.setStyle(
@@ -1045,7 +1128,7 @@ def export_audit_logs():
         doc.build(story, onFirstPage=_draw_footer, onLaterPages=_draw_footer)
         buffer.seek(0)
 
-        filename = f"audit_logs_{datetime.utcnow().strftime('%Y%m%d_%H%M%S')}.pdf"
+        filename = f"audit_logs_{datetime.now(timezone.utc).strftime('%Y%m%d_%H%M%S')}.pdf"
         return Response(
             buffer.getvalue(),
             mimetype="application/pdf",
@@ -1072,7 +1155,7 @@ def update_user_status(user_id):
         if new_status not in ["active", "suspended"]:
             return jsonify({"error": "Invalid status. Use 'active' or 'suspended'"}), 400
 
-        now = datetime.utcnow().isoformat()
+        now = utc_now_iso()
 
         # . Fetch user
         user_res = (
@@ -1089,15 +1172,8 @@ def update_user_status(user_id):
         user = user_res.data
 
         # . Prevent self-suspension (admin can't suspend themselves)
-        auth_header = request.headers.get("Authorization")
-        if auth_header:
-            try:
-                token = auth_header.split(" ")[1]
-                payload = decode_jwt(token)
-                if payload and payload.get("user_id") == user_id:
-                    return jsonify({"error": "You cannot suspend your own account"}), 400
-            except Exception:
-                pass
+        if getattr(request, "admin_id", None) == user_id:
+            return jsonify({"error": "You cannot suspend your own account"}), 400
 
         # . Update user status
         supabase.table("users").update({
@@ -1112,14 +1188,14 @@ def update_user_status(user_id):
             else "Your account has been reactivated. You can now access all features."
         )
 
-        supabase.table("notifications").insert({
+        _queue_notification({
             "user_id": user_id,
             "title": notification_title,
             "message": notification_message,
             "type": "status_update",
             "read": False,
             "created_at": now,
-        }).execute()
+        })
 
         # . Send email notification
         try:
@@ -1129,38 +1205,19 @@ def update_user_status(user_id):
                 else "Account Reactivated - FoodShare"
             )
 
-            body = (
-                f"""
-Hello {user.get("full_name", "User")},
-
-Your FoodShare account has been suspended due to a policy violation or admin action.
-
-If you believe this was done in error, please contact our support team.
-
-Regards,
-The FoodShare Team
-"""
+            body = render_template(
+                "email/account_suspended.txt"
                 if new_status == "suspended"
-                else f"""
-Hello {user.get("full_name", "User")},
-
-Good news! Your FoodShare account has been reactivated.
-
-You can now log in and access all platform features.
-
-Thank you for being part of our community!
-
-Warm regards,
-The FoodShare Team
-"""
+                else "email/account_reactivated.txt",
+                name=user.get("full_name", "User"),
             )
 
             msg = Message(subject=subject, recipients=[user.get("email")])
             msg.body = body
-            mail.send(msg)
+            send_async(msg)
 
         except Exception as email_err:
-            logger.error(f"Failed to send status update email: {email_err}")
+            logger.error("Failed to send status update email: %s", email_err)
 
         log_audit(
             "user_status_edited",
@@ -1178,7 +1235,6 @@ The FoodShare Team
 
     except Exception as e:
         logger.exception("Update user status error")
-        traceback.print_exc()
         return jsonify({"error": str(e)}), 500
 
 
@@ -1209,21 +1265,11 @@ def delete_user_admin(user_id):
         if user.get("role") == "admin":
             return jsonify({"error": "Admin accounts cannot be deleted"}), 403
 
-        # . Anonymize donations (preserve history)
-        supabase.table("food_donations").update({
-            "donor_id": None,
-        }).eq("donor_id", user_id).execute()
-
-        # . Delete related data
-        supabase.table("notifications").delete().eq("user_id", user_id).execute()
-        supabase.table("password_change_codes").delete().eq("user_id", user_id).execute()
-        supabase.table("organizations").delete().eq("user_id", user_id).execute()
-        supabase.table("ngo_claims").delete().eq("ngo_id", user_id).execute()
-
-        # . Delete user
-        supabase.table("users").delete().eq("id", user_id).execute()
+        # . Anonymize donations, delete related data and the user in one
+        #   transaction (see supabase/migrations/*_delete_user_cascade.sql)
+        supabase.rpc("delete_user_cascade", {"p_user_id": user_id}).execute()
 
-        logger.info(f"Admin deleted user: {user_id}")
+        logger.info("Admin deleted user: %s", user_id)
 
         log_audit(
             "user_deleted_by_admin",
@@ -1241,10 +1287,17 @@ def delete_user_admin(user_id):
 
     except Exception as e:
         logger.exception("Delete user error")
-        traceback.print_exc()
         return jsonify({"error": str(e)}), 500
 
 
+# Donation columns shown in admin listings/reports (skips the base64 qr_code blob)
+ADMIN_DONATION_COLUMNS = (
+    "id, donor_id, title, description, category, quantity, unit, expiry_date, "
+    "pickup_address, pickup_lat, pickup_lng, pickup_instructions, status, "
+    "final_state, urgency, created_at, updated_at"
+)
+
+
 # GET ALL DONATIONS (Admin View)
 # GET /api/admin/donations
 @admin_bp.route("/admin/donations", methods=["GET"])
@@ -1256,12 +1309,15 @@ def get_all_donations():
     try:
         status = request.args.get("status")
         category = request.args.get("category")
-        page = int(request.args.get("page", 1))
-        limit = int(request.args.get("limit", 50))
+        page = max(int(request.args.get("page", 1)), 1)
+        limit = min(max(int(request.args.get("limit", 50)), 1), 100)
         offset = (page - 1) * limit
 
-        # Build query
-        query = supabase.table("food_donations").select("*")
+        # Build query (donor embedded via the donor_id foreign key)
+        query = supabase.table("food_donations").select(
+            f"{ADMIN_DONATION_COLUMNS}, donor:users!donor_id(id, full_name, email)",
+            count="exact",
+        )
 
         if status and status != "all":
             query = query.eq("status", status)
@@ -1269,52 +1325,133 @@ def get_all_donations():
         if category and category != "all":
             query = query.eq("category", category)
 
-        query = query.order("created_at", desc=True)
+        query = query.order("created_at", desc=True).range(offset, offset + limit - 1)
 
-        # Execute
+        # Execute (one page plus the filtered total)
         donations_res = query.execute()
         donations = donations_res.data or []
+        total = donations_res.count or 0
 
-        # Get donor info
-        donor_ids = list({d["donor_id"] for d in donations if d.get("donor_id")})
-        donors_map = {}
-
-        if donor_ids:
-            donors_res = (
-                supabase.table("users")
-                .select("id, full_name, email")
-                .in_("id", donor_ids)
-                .execute()
-            )
-            donors_map = {d["id"]: d for d in (donors_res.data or [])}
-
-        # Enrich donations
+        # Flatten embedded donor
         enriched = []
         for d in donations:
-            donor = donors_map.get(d.get("donor_id"), {})
+            donor = d.pop("donor", None) or {}
             enriched.append({
                 **d,
                 "donor_name": donor.get("full_name"),
                 "donor_email": donor.get("email"),
             })
 
-        total = len(enriched)
-        paginated = enriched[offset:offset + limit]
-
-        return jsonify({
-            "donations": paginated,
+        return ojson({
+            "donations": enriched,
             "total": total,
             "page": page,
             "limit": limit,
             "pages": (total + limit - 1) // limit,
-        }), 200
+        })
 
     except Exception as e:
         logger.exception("Get all donations error")
-        traceback.print_exc()
         return jsonify({"error": str(e)}), 500
 
 
+# Row-level reports that can be streamed with ?format=ndjson
+# report_type -> (table, columns, order column)
+STREAMABLE_REPORTS = {
+    "users": ("users", "id, full_name, email, phone, role, status, created_at", "created_at"),
+    "donations": ("food_donations", ADMIN_DONATION_COLUMNS, "created_at"),
+    "claims": (
+        "ngo_claims",
+        "id, donation_id, ngo_id, status, claimed_at, completed_at, cancelled_at, updated_at",
+        "claimed_at",
+    ),
+}
+REPORT_PAGE_SIZE = 1000
+
+# Column matched by ?status= when it is not called "status"
+REPORT_STATUS_COLUMNS = {"organizations": "verification_status"}
+
+
+def _parse_report_bound(value: str, end: bool = False):
+    """
+    Parse a ?from= / ?to= value (YYYY-MM-DD or ISO timestamp). A bare `to`
+    date covers that whole day. Raises ValueError on bad input.
+    """
+    if len(value) == 10:
+        day = date.fromisoformat(value)
+        return (day + timedelta(days=1) if end else day).isoformat()
+    return datetime.fromisoformat(value.replace("Z", "+00:00")).isoformat()
+
+
+def _report_filters(table: str, date_column: str):
+    """
+    PostgREST filters from ?from=&to=&status= as (method, column, value)
+    tuples, validated up front so a streamed export never fails half way.
+    """
+    args = request.args
+    filters = []
+    if args.get("from"):
+        filters.append(("gte", date_column, _parse_report_bound(args["from"])))
+    if args.get("to"):
+        to = args["to"]
+        filters.append(("lt" if len(to) == 10 else "lte", date_column, _parse_report_bound(to, end=True)))
+    if args.get("status"):
+        filters.append(("eq", REPORT_STATUS_COLUMNS.get(table, "status"), args["status"]))
+    return filters
+
+
+def _iter_report_pages(
+    table: str,
+    columns: str,
+    order_column: str,
+    page_size: int = REPORT_PAGE_SIZE,
+    filters=(),
+):
+    """Yield pages of rows so only one page is held in memory."""
+    offset = 0
+
+    def page_query():
+        query = supabase.table(table).select(columns)
+        for method, column, value in filters:
+            query = getattr(query, method)(column, value)
+        return (
+            query
+            .order(order_column, desc=True)
+            .order("id")
+            .range(offset, offset + page_size - 1)
+        )
+
+    while True:
+        page_res = execute_with_retry(page_query)
+        rows = page_res.data or []
+        if rows:
+            yield rows
+        if len(rows) < page_size:
+            return
+        offset += page_size
+
+
+def _iter_report_rows(
+    table: str,
+    columns: str,
+    order_column: str,
+    page_size: int = REPORT_PAGE_SIZE,
+    filters=(),
+):
+    for page in _iter_report_pages(table, columns, order_column, page_size, filters):
+        yield from page
+
+
+def _csv_select(columns) -> str:
+    """PostgREST select list for a CSV layout (only the exported columns)."""
+    return ", ".join(key for _, key in columns)
+
+
+def _ndjson_iter(rows):
+    for row in rows:
+        yield orjson.dumps(row) + b"\n"
+
+
 # GENERATE REPORTS
 # GET /api/admin/reports/<report_type>
 @admin_bp.route("/admin/reports/<report_type>", methods=["GET"])
@@ -1323,9 +1460,22 @@ def generate_report(report_type):
     """
     Generate various admin reports
     Supported types: users, donations, ngos, impact
+    ?format=ndjson streams the rows of users/donations/claims page by page
     """
     try:
         today = date.today()
+
+        if request.args.get("format") == "ndjson" and report_type in STREAMABLE_REPORTS:
+            table, columns, order_column = STREAMABLE_REPORTS[report_type]
+            try:
+                filters = _report_filters(table, order_column)
+            except ValueError:
+                return jsonify({"error": "from/to must be ISO dates (YYYY-MM-DD)"}), 400
+            rows = _iter_report_rows(table, columns, order_column, filters=filters)
+            return Response(
+                stream_with_context(_ndjson_iter(rows)),
+                mimetype="application/x-ndjson",
+            )
         
         if report_type == "users":
             # User report
@@ -1336,71 +1486,78 @@ def generate_report(report_type):
                 .execute()
             )
             
-            return jsonify({
+            return ojson({
                 "report_type": "users",
-                "generated_at": datetime.utcnow().isoformat(),
+                "generated_at": utc_now_iso(),
                 "total_records": len(users_res.data or []),
                 "data": users_res.data or [],
-            }), 200
+            })
 
         elif report_type == "user-activity":
             report_rows = _build_user_activity_report()
-            return jsonify({
+            return ojson({
                 "report_type": "user-activity",
-                "generated_at": datetime.utcnow().isoformat(),
+                "generated_at": utc_now_iso(),
                 "total_records": len(report_rows),
                 "data": report_rows,
-            }), 200
+            })
 
         elif report_type == "new-registrations":
             report_rows = _build_new_registrations_report()
-            return jsonify({
+            return ojson({
                 "report_type": "new-registrations",
-                "generated_at": datetime.utcnow().isoformat(),
+                "generated_at": utc_now_iso(),
                 "total_records": len(report_rows),
                 "filters": {"window_days": 30},
                 "data": report_rows,
-            }), 200
+            })
 
         elif report_type == "user-roles-distribution":
             report_rows = _build_user_roles_distribution_report()
-            return jsonify({
+            return ojson({
                 "report_type": "user-roles-distribution",
-                "generated_at": datetime.utcnow().isoformat(),
+                "generated_at": utc_now_iso(),
                 "total_records": len(report_rows),
                 "data": report_rows,
-            }), 200
+            })
 
         elif report_type == "donations":
             # Donations report
             donations_res = (
                 supabase.table("food_donations")
-                .select("*")
+                .select(ADMIN_DONATION_COLUMNS)
                 .order("created_at", desc=True)
                 .execute()
             )
             
             donations = donations_res.data or []
             
-            # Summary stats
+            # Summary stats (single pass per field)
+            status_counts = Counter(d.get("status") for d in donations)
+            final_counts = Counter(d.get("final_state") for d in donations)
             summary = {
                 "total": len(donations),
-                "available": len([d for d in donations if d.get("status") == "available"]),
-                "claimed": len([d for d in donations if d.get("status") == "claimed"]),
-                "completed": len([d for d in donations if d.get("status") == "completed"]),
-                "expired": len([d for d in donations if d.get("final_state") == "expired"]),
-                "cancelled": len([d for d in donations if d.get("final_state") == "cancelled_by_donor"]),
+                "available": status_counts["available"],
+                "claimed": status_counts["claimed"],
+                "completed": status_counts["completed"],
+                "expired": final_counts["expired"],
+                "cancelled": final_counts["cancelled_by_donor"],
             }
             
-            return jsonify({
+            return ojson({
                 "report_type": "donations",
-                "generated_at": datetime.utcnow().isoformat(),
+                "generated_at": utc_now_iso(),
                 "summary": summary,
                 "data": donations,
-            }), 200
+            })
 
         elif report_type == "ngos":
-            # NGO report
+            # NGO report; claim stats do not depend on the organizations,
+            # so fetch them while the organization/user lookups run
+            claims_future = _report_executor.submit(
+                execute_with_retry,
+                lambda: supabase.table("ngo_claims").select("ngo_id, status"),
+            )
             orgs_res = (
                 supabase.table("organizations")
                 .select("*")
@@ -1424,11 +1581,7 @@ def generate_report(report_type):
                 users_map = {u["id"]: u for u in (users_res.data or [])}
             
             # Get claim stats
-            claims_res = (
-                supabase.table("ngo_claims")
-                .select("ngo_id, status")
-                .execute()
-            )
+            claims_res = claims_future.result()
             
             claims_map = {}
             for c in (claims_res.data or []):
@@ -1441,31 +1594,33 @@ def generate_report(report_type):
                         claims_map[ngo_id]["completed"] += 1
             
             # Enrich data
-            enriched = []
-            for org in orgs:
-                user = users_map.get(org.get("user_id"), {})
-                claims = claims_map.get(org.get("user_id"), {"total": 0, "completed": 0})
-                
-                enriched.append({
+            no_claims = {"total": 0, "completed": 0}
+            enriched = [
+                {
                     **org,
-                    "email": user.get("email"),
+                    "email": users_map.get(user_id, {}).get("email"),
                     "total_claims": claims["total"],
                     "completed_claims": claims["completed"],
-                })
+                }
+                for org in orgs
+                for user_id in (org.get("user_id"),)
+                for claims in (claims_map.get(user_id, no_claims),)
+            ]
             
+            verification_counts = Counter(o.get("verification_status") for o in orgs)
             summary = {
                 "total": len(orgs),
-                "approved": len([o for o in orgs if o.get("verification_status") == "approved"]),
-                "pending": len([o for o in orgs if o.get("verification_status") == "pending"]),
-                "rejected": len([o for o in orgs if o.get("verification_status") == "rejected"]),
+                "approved": verification_counts["approved"],
+                "pending": verification_counts["pending"],
+                "rejected": verification_counts["rejected"],
             }
             
-            return jsonify({
+            return ojson({
                 "report_type": "ngos",
-                "generated_at": datetime.utcnow().isoformat(),
+                "generated_at": utc_now_iso(),
                 "summary": summary,
                 "data": enriched,
-            }), 200
+            })
 
         elif report_type == "claims":
             claims_res = (
@@ -1476,440 +1631,329 @@ def generate_report(report_type):
             )
 
             claims = claims_res.data or []
+            status_counts = Counter(c.get("status") for c in claims)
             summary = {
                 "total": len(claims),
-                "claimed": len([c for c in claims if c.get("status") == "claimed"]),
-                "completed": len([c for c in claims if c.get("status") == "completed"]),
-                "cancelled": len([c for c in claims if c.get("status") == "cancelled"]),
+                "claimed": status_counts["claimed"],
+                "completed": status_counts["completed"],
+                "cancelled": status_counts["cancelled"],
             }
 
-            return jsonify({
+            return ojson({
                 "report_type": "claims",
-                "generated_at": datetime.utcnow().isoformat(),
+                "generated_at": utc_now_iso(),
                 "summary": summary,
                 "data": claims,
-            }), 200
+            })
 
         elif report_type == "impact":
             # Platform impact report
-            
-            # Completed claims with donation data
-            claims_res = (
-                supabase.table("ngo_claims")
-                .select("donation_id, status, completed_at")
-                .eq("status", "completed")
-                .execute()
-            )
-            
-            claims = claims_res.data or []
-            donation_ids = list({c["donation_id"] for c in claims if c.get("donation_id")})
-            
-            donations_map = {}
-            if donation_ids:
-                donations_res = (
-                    supabase.table("food_donations")
-                    .select("id, quantity, unit, category")
-                    .in_("id", donation_ids)
-                    .execute()
-                )
-                donations_map = {d["id"]: d for d in (donations_res.data or [])}
-            
-            # Calculate impact metrics
-            PIECE_TO_KG = {"Fruits": 0.18, "Vegetables": 0.25, "Meat": 0.30, "Dairy": 0.50, "Grains": 0.40, "Prepared Food": 0.40}
-            
-            def convert_to_kg(qty, unit, category):
-                try:
-                    qty = float(qty)
-                except:
-                    return 0.0
-                
-                unit = (unit or "").lower()
-                if unit == "kg":
-                    return qty
-                if unit == "pieces":
-                    return qty * PIECE_TO_KG.get(category, 0.25)
-                if unit == "liters":
-                    return qty * 1.0
-                if unit == "boxes":
-                    return qty * 5.0
-                return 0.0
-            
-            total_food_kg = 0.0
-            category_breakdown = {}
-            
-            for c in claims:
-                donation = donations_map.get(c.get("donation_id"))
-                if donation:
-                    kg = convert_to_kg(
-                        donation.get("quantity", 0),
-                        donation.get("unit"),
-                        donation.get("category")
-                    )
-                    total_food_kg += kg
-                    
-                    cat = donation.get("category", "Other")
-                    category_breakdown[cat] = category_breakdown.get(cat, 0) + kg
-            
-            # Environmental impact estimates
-            co2_avoided = total_food_kg * 2.5 # ~2.5kg CO2 per kg food waste
-            water_saved = total_food_kg * 1000 # ~1000L water per kg food
-            
-            return jsonify({
+            impact = _build_impact_report()
+            return ojson({
                 "report_type": "impact",
-                "generated_at": datetime.utcnow().isoformat(),
-                "metrics": {
-                    "total_food_saved_kg": round(total_food_kg, 2),
-                    "co2_avoided_kg": round(co2_avoided, 2),
-                    "water_saved_liters": round(water_saved, 2),
-                    "completed_donations": len(claims),
-                },
-                "category_breakdown": {
-                    k: round(v, 2) for k, v in category_breakdown.items()
-                },
-            }), 200
+                "generated_at": utc_now_iso(),
+                "metrics": impact["metrics"],
+                "category_breakdown": impact["category_breakdown"],
+            })
 
         else:
             return jsonify({"error": f"Unknown report type: {report_type}"}), 400
 
     except Exception as e:
         logger.exception("Generate report error")
-        traceback.print_exc()
         return jsonify({"error": str(e)}), 500
 
 
+# CSV export layouts: (header, row key) in column order
+USERS_CSV_COLUMNS = (
+    ("ID", "id"),
+    ("Full Name", "full_name"),
+    ("Email", "email"),
+    ("Phone", "phone"),
+    ("Role", "role"),
+    ("Status", "status"),
+    ("Created At", "created_at"),
+)
+NEW_REGISTRATIONS_CSV_COLUMNS = (
+    ("User ID", "id"),
+    ("Full Name", "full_name"),
+    ("Email", "email"),
+    ("Phone", "phone"),
+    ("Role", "role"),
+    ("Status", "status"),
+    ("Created At", "created_at"),
+)
+USER_ACTIVITY_CSV_COLUMNS = (
+    ("User ID", "id"),
+    ("Full Name", "full_name"),
+    ("Email", "email"),
+    ("Role", "role"),
+    ("Account Status", "account_status"),
+    ("Last Login", "last_login"),
+    ("Total Logins", "total_logins"),
+    ("Total Actions", "total_actions"),
+    ("Last Action", "last_action"),
+    ("Activity Level", "activity_level"),
+)
+USER_ROLES_CSV_COLUMNS = (
+    ("Role", "role"),
+    ("Total Users", "total_users"),
+    ("Percentage", "percentage"),
+    ("Active Users", "active_users"),
+    ("Pending Users", "pending_users"),
+    ("Suspended Users", "suspended_users"),
+)
+DONATIONS_CSV_COLUMNS = (
+    ("ID", "id"),
+    ("Title", "title"),
+    ("Category", "category"),
+    ("Quantity", "quantity"),
+    ("Unit", "unit"),
+    ("Status", "status"),
+    ("Final State", "final_state"),
+    ("Created At", "created_at"),
+    ("Expiry Date", "expiry_date"),
+)
+CLAIMS_CSV_COLUMNS = (
+    ("ID", "id"),
+    ("Donation ID", "donation_id"),
+    ("NGO ID", "ngo_id"),
+    ("Status", "status"),
+    ("Claimed At", "claimed_at"),
+    ("Completed At", "completed_at"),
+    ("Cancelled At", "cancelled_at"),
+    ("Updated At", "updated_at"),
+)
+NGOS_CSV_COLUMNS = (
+    ("ID", "id"),
+    ("User ID", "user_id"),
+    ("Name", "name"),
+    ("Phone", "phone"),
+    ("Address", "address"),
+    ("Verification Status", "verification_status"),
+    ("Created At", "created_at"),
+    ("Description", "description"),
+)
+CSV_FLUSH_BYTES = 64 * 1024
+
+
+def _iter_csv(columns, pages, preamble=()):
+    """
+    Yield CSV text in ~64 KiB chunks. Each page of row dicts is written with
+    DictWriter.writerows (one C-level loop) instead of a per-row Python list.
+    """
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerows(preamble)
+    writer.writerow([header for header, _ in columns])
+
+    dict_writer = csv.DictWriter(
+        buffer,
+        fieldnames=[key for _, key in columns],
+        extrasaction="ignore",
+    )
+    for page in pages:
+        dict_writer.writerows(page)
+        if buffer.tell() >= CSV_FLUSH_BYTES:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate(0)
+
+    yield buffer.getvalue()
+
+
+def _date_only_rows(pages, *keys):
+    """Trim ISO timestamps to their date part for the given keys."""
+    for page in pages:
+        for row in page:
+            for key in keys:
+                row[key] = str(row.get(key) or "").split("T")[0]
+        yield page
+
+
+def _csv_response(chunks, filename: str) -> Response:
+    return Response(
+        stream_with_context(chunks),
+        mimetype="text/csv",
+        headers={"Content-Disposition": f"attachment; filename={filename}"},
+    )
+
+
 # EXPORT REPORT AS CSV
 # GET /api/admin/reports/<report_type>/export
 @admin_bp.route("/admin/reports/<report_type>/export", methods=["GET"])
 @require_admin
 def export_report_csv(report_type):
     """
-    Export report data as CSV
+    Export report data as CSV (streamed; table exports are read page by page)
     """
     try:
-        from flask import Response
-        
+        today = date.today()
+
+        # ?from=&to=&status= narrow the table exports in Postgres
+        filter_tables = {
+            "users": "users",
+            "donations": "food_donations",
+            "claims": "ngo_claims",
+            "ngos": "organizations",
+        }
+        filters = ()
+        if report_type in filter_tables:
+            date_column = "claimed_at" if report_type == "claims" else "created_at"
+            try:
+                filters = _report_filters(filter_tables[report_type], date_column)
+            except ValueError:
+                return jsonify({"error": "from/to must be ISO dates (YYYY-MM-DD)"}), 400
+
         if report_type == "users":
-            users_res = (
-                supabase.table("users")
-                .select("id, full_name, email, phone, role, status, created_at")
-                .order("created_at", desc=True)
-                .execute()
-            )
-            
-            data = users_res.data or []
-            headers = ["ID", "Full Name", "Email", "Phone", "Role", "Status", "Created At"]
-            
-            output = io.StringIO()
-            writer = csv.writer(output)
-            writer.writerow(headers)
-            
-            for row in data:
-                writer.writerow([
-                    row.get("id"),
-                    row.get("full_name"),
-                    row.get("email"),
-                    row.get("phone"),
-                    row.get("role"),
-                    row.get("status"),
-                    row.get("created_at"),
-                ])
-            
-            output.seek(0)
-            
-            return Response(
-                output.getvalue(),
-                mimetype="text/csv",
-                headers={"Content-Disposition": f"attachment; filename=users_report_{date.today()}.csv"}
+            pages = _iter_report_pages(
+                "users", _csv_select(USERS_CSV_COLUMNS), "created_at", filters=filters
             )
+            return _csv_response(_iter_csv(USERS_CSV_COLUMNS, pages), f"users_report_{today}.csv")
 
         elif report_type == "user-activity":
-            data = _build_user_activity_report()
-            headers = [
-                "User ID",
-                "Full Name",
-                "Email",
-                "Role",
-                "Account Status",
-                "Last Login",
-                "Total Logins",
-                "Total Actions",
-                "Last Action",
-                "Activity Level",
-            ]
-
-            output = io.StringIO()
-            writer = csv.writer(output)
-            writer.writerow(headers)
-
-            for row in data:
-                writer.writerow([
-                    row.get("id"),
-                    row.get("full_name"),
-                    row.get("email"),
-                    row.get("role"),
-                    row.get("account_status"),
-                    row.get("last_login"),
-                    row.get("total_logins"),
-                    row.get("total_actions"),
-                    row.get("last_action"),
-                    row.get("activity_level"),
-                ])
-
-            output.seek(0)
-
-            return Response(
-                output.getvalue(),
-                mimetype="text/csv",
-                headers={"Content-Disposition": f"attachment; filename=user_activity_report_{date.today()}.csv"}
+            pages = [_build_user_activity_report()]
+            return _csv_response(
+                _iter_csv(USER_ACTIVITY_CSV_COLUMNS, pages),
+                f"user_activity_report_{today}.csv",
             )
 
         elif report_type == "new-registrations":
-            data = _build_new_registrations_report()
-            headers = ["User ID", "Full Name", "Email", "Phone", "Role", "Status", "Created At"]
-
-            output = io.StringIO()
-            writer = csv.writer(output)
-            writer.writerow(["Report Window", "Last 30 Days"])
-            writer.writerow([])
-            writer.writerow(headers)
-
-            for row in data:
-                writer.writerow([
-                    row.get("id"),
-                    row.get("full_name"),
-                    row.get("email"),
-                    row.get("phone"),
-                    row.get("role"),
-                    row.get("status"),
-                    row.get("created_at"),
-                ])
-
-            output.seek(0)
-
-            return Response(
-                output.getvalue(),
-                mimetype="text/csv",
-                headers={"Content-Disposition": f"attachment; filename=new_registrations_report_{date.today()}.csv"}
+            pages = [_build_new_registrations_report()]
+            return _csv_response(
+                _iter_csv(
+                    NEW_REGISTRATIONS_CSV_COLUMNS,
+                    pages,
+                    preamble=[["Report Window", "Last 30 Days"], []],
+                ),
+                f"new_registrations_report_{today}.csv",
             )
 
         elif report_type == "user-roles-distribution":
-            data = _build_user_roles_distribution_report()
-            headers = ["Role", "Total Users", "Percentage", "Active Users", "Pending Users", "Suspended Users"]
-
-            output = io.StringIO()
-            writer = csv.writer(output)
-            writer.writerow(headers)
-
-            for row in data:
-                writer.writerow([
-                    row.get("role"),
-                    row.get("total_users"),
-                    row.get("percentage"),
-                    row.get("active_users"),
-                    row.get("pending_users"),
-                    row.get("suspended_users"),
-                ])
-
-            output.seek(0)
-
-            return Response(
-                output.getvalue(),
-                mimetype="text/csv",
-                headers={"Content-Disposition": f"attachment; filename=user_roles_distribution_{date.today()}.csv"}
+            pages = [_build_user_roles_distribution_report()]
+            return _csv_response(
+                _iter_csv(USER_ROLES_CSV_COLUMNS, pages),
+                f"user_roles_distribution_{today}.csv",
             )
 
         elif report_type == "donations":
-            donations_res = (
-                supabase.table("food_donations")
-                .select("id, title, category, quantity, unit, status, final_state, created_at, expiry_date")
-                .order("created_at", desc=True)
-                .execute()
+            pages = _date_only_rows(
+                _iter_report_pages(
+                    "food_donations", _csv_select(DONATIONS_CSV_COLUMNS), "created_at", filters=filters
+                ),
+                "created_at",
+                "expiry_date",
             )
-            
-            data = donations_res.data or []
-            headers = ["ID", "Title", "Category", "Quantity", "Unit", "Status", "Final State", "Created At", "Expiry Date"]
-            
-            output = io.StringIO()
-            writer = csv.writer(output)
-            writer.writerow(headers)
-            
-            for row in data:
-                created_at = str(row.get("created_at") or "").split("T")[0]
-                expiry_date = str(row.get("expiry_date") or "").split("T")[0]
-                writer.writerow([
-                    row.get("id"),
-                    row.get("title"),
-                    row.get("category"),
-                    row.get("quantity"),
-                    row.get("unit"),
-                    row.get("status"),
-                    row.get("final_state"),
-                    created_at,
-                    expiry_date,
-                ])
-            
-            output.seek(0)
-            
-            return Response(
-                output.getvalue(),
-                mimetype="text/csv",
-                headers={"Content-Disposition": f"attachment; filename=donations_report_{date.today()}.csv"}
+            return _csv_response(
+                _iter_csv(DONATIONS_CSV_COLUMNS, pages),
+                f"donations_report_{today}.csv",
             )
 
         elif report_type == "claims":
-            claims_res = (
-                supabase.table("ngo_claims")
-                .select("id, donation_id, ngo_id, status, claimed_at, completed_at, cancelled_at, updated_at")
-                .order("claimed_at", desc=True)
-                .execute()
+            pages = _iter_report_pages(
+                "ngo_claims", _csv_select(CLAIMS_CSV_COLUMNS), "claimed_at", filters=filters
             )
+            return _csv_response(_iter_csv(CLAIMS_CSV_COLUMNS, pages), f"claims_report_{today}.csv")
 
-            data = claims_res.data or []
-            headers = ["ID", "Donation ID", "NGO ID", "Status", "Claimed At", "Completed At", "Cancelled At", "Updated At"]
-
-            output = io.StringIO()
-            writer = csv.writer(output)
-            writer.writerow(headers)
-
-            for row in data:
-                writer.writerow([
-                    row.get("id"),
-                    row.get("donation_id"),
-                    row.get("ngo_id"),
-                    row.get("status"),
-                    row.get("claimed_at"),
-                    row.get("completed_at"),
-                    row.get("cancelled_at"),
-                    row.get("updated_at"),
-                ])
-
-            output.seek(0)
-
-            return Response(
-                output.getvalue(),
-                mimetype="text/csv",
-                headers={"Content-Disposition": f"attachment; filename=claims_report_{date.today()}.csv"}
+        elif report_type == "ngos":
+            pages = _iter_report_pages(
+                "organizations", _csv_select(NGOS_CSV_COLUMNS), "created_at", filters=filters
             )
+            return _csv_response(_iter_csv(NGOS_CSV_COLUMNS, pages), f"ngos_report_{today}.csv")
 
-        elif report_type == "ngos":
-            orgs_res = (
-                supabase.table("organizations")
-                .select("id, user_id, name, address, description, phone, verification_status, created_at")
-                .order("created_at", desc=True)
-                .execute()
+        elif report_type == "impact":
+            impact = _build_impact_report()
+            metrics = impact["metrics"]
+
+            preamble = [
+                ["Metric", "Value"],
+                ["Total Food Saved (kg)", metrics["total_food_saved_kg"]],
+                ["CO2 Avoided (kg)", metrics["co2_avoided_kg"]],
+                ["Water Saved (liters)", metrics["water_saved_liters"]],
+                ["Completed Donations", metrics["completed_donations"]],
+                [],
+            ]
+            pages = [[
+                {"category": category, "food_saved_kg": kg}
+                for category, kg in impact["category_breakdown"].items()
+            ]]
+            return _csv_response(
+                _iter_csv(
+                    (("Category", "category"), ("Food Saved (kg)", "food_saved_kg")),
+                    pages,
+                    preamble=preamble,
+                ),
+                f"impact_report_{today}.csv",
             )
 
-            data = orgs_res.data or []
-            headers = ["ID", "User ID", "Name", "Phone", "Address", "Verification Status", "Created At", "Description"]
+        else:
+            return jsonify({"error": f"CSV export not available for: {report_type}"}), 400
 
-            output = io.StringIO()
-            writer = csv.writer(output)
-            writer.writerow(headers)
+    except Exception as e:
+        logger.exception("Export CSV error")
+        return jsonify({"error": str(e)}), 500
 
-            for row in data:
-                writer.writerow([
-                    row.get("id"),
-                    row.get("user_id"),
-                    row.get("name"),
-                    row.get("phone"),
-                    row.get("address"),
-                    row.get("verification_status"),
-                    row.get("created_at"),
-                    row.get("description"),
-                ])
 
-            output.seek(0)
+BROADCAST_PAGE_SIZE = 1000
+BROADCAST_INSERT_WORKERS = 8
 
-            return Response(
-                output.getvalue(),
-                mimetype="text/csv",
-                headers={"Content-Disposition": f"attachment; filename=ngos_report_{date.today()}.csv"}
-            )
 
-        elif report_type == "impact":
-            claims_res = (
-                supabase.table("ngo_claims")
-                .select("donation_id, status")
-                .eq("status", "completed")
-                .execute()
-            )
+def _iter_broadcast_user_ids(target_role: str | None):
+    """Yield pages of active user ids using keyset pagination on id."""
+    def page_query(after_id):
+        # Built fresh per attempt: postgrest builders mutate in place, so a
+        # retried builder would repeat its order/limit params
+        query = supabase.table("users").select("id").eq("status", "active")
+        if target_role:
+            query = query.eq("role", target_role)
+        if after_id is not None:
+            query = query.gt("id", after_id)
+        return query.order("id").limit(BROADCAST_PAGE_SIZE)
 
-            claims = claims_res.data or []
-            donation_ids = list({c["donation_id"] for c in claims if c.get("donation_id")})
-
-            donations_map = {}
-            if donation_ids:
-                donations_res = (
-                    supabase.table("food_donations")
-                    .select("id, quantity, unit, category")
-                    .in_("id", donation_ids)
-                    .execute()
-                )
-                donations_map = {d["id"]: d for d in (donations_res.data or [])}
-
-            PIECE_TO_KG = {"Fruits": 0.18, "Vegetables": 0.25, "Meat": 0.30, "Dairy": 0.50, "Grains": 0.40, "Prepared Food": 0.40}
-
-            def convert_to_kg(qty, unit, category):
-                try:
-                    qty = float(qty)
-                except Exception:
-                    return 0.0
-                unit = (unit or "").lower()
-                if unit == "kg":
-                    return qty
-                if unit == "pieces":
-                    return qty * PIECE_TO_KG.get(category, 0.25)
-                if unit == "liters":
-                    return qty * 1.0
-                if unit == "boxes":
-                    return qty * 5.0
-                return 0.0
-
-            total_food_kg = 0.0
-            category_breakdown = {}
-            for c in claims:
-                donation = donations_map.get(c.get("donation_id"))
-                if not donation:
-                    continue
-                kg = convert_to_kg(
-                    donation.get("quantity", 0),
-                    donation.get("unit"),
-                    donation.get("category")
-                )
-                total_food_kg += kg
-                cat = donation.get("category", "Other")
-                category_breakdown[cat] = category_breakdown.get(cat, 0) + kg
-
-            co2_avoided = total_food_kg * 2.5
-            water_saved = total_food_kg * 1000
-
-            output = io.StringIO()
-            writer = csv.writer(output)
-            writer.writerow(["Metric", "Value"])
-            writer.writerow(["Total Food Saved (kg)", round(total_food_kg, 2)])
-            writer.writerow(["CO2 Avoided (kg)", round(co2_avoided, 2)])
-            writer.writerow(["Water Saved (liters)", round(water_saved, 2)])
-            writer.writerow(["Completed Donations", len(claims)])
-            writer.writerow([])
-            writer.writerow(["Category", "Food Saved (kg)"])
-            for k, v in category_breakdown.items():
-                writer.writerow([k, round(v, 2)])
-
-            output.seek(0)
+    last_id = None
+    while True:
+        page_res = execute_with_retry(lambda: page_query(last_id))
+        rows = page_res.data or []
+        if not rows:
+            return
 
-            return Response(
-                output.getvalue(),
-                mimetype="text/csv",
-                headers={"Content-Disposition": f"attachment; filename=impact_report_{date.today()}.csv"}
-            )
+        yield [row["id"] for row in rows]
+        if len(rows) < BROADCAST_PAGE_SIZE:
+            return
+        last_id = rows[-1]["id"]
 
-        else:
-            return jsonify({"error": f"CSV export not available for: {report_type}"}), 400
 
-    except Exception as e:
-        logger.exception("Export CSV error")
-        traceback.print_exc()
-        return jsonify({"error": str(e)}), 500
+def _broadcast_in_batches(title, message, target_role, now):
+    """
+    Fallback when the broadcast RPC is unavailable: page through target users
+    by id and insert each page as one batch; inserts run concurrently while
+    the next page is fetched. Returns the number of recipients.
+    """
+    recipients = 0
+    with ThreadPoolExecutor(max_workers=BROADCAST_INSERT_WORKERS) as pool:
+        futures = []
+        for user_ids in _iter_broadcast_user_ids(target_role):
+            batch = [
+                {
+                    "user_id": user_id,
+                    "title": title,
+                    "message": message,
+                    "type": "broadcast",
+                    "read": False,
+                    "created_at": now,
+                }
+                for user_id in user_ids
+            ]
+            futures.append(pool.submit(
+                lambda rows: supabase.table("notifications").insert(rows).execute(),
+                batch,
+            ))
+            recipients += len(batch)
+
+        for future in futures:
+            future.result()
+
+    return recipients
 
 
 # SEND BROADCAST NOTIFICATION
@@ -1929,84 +1973,92 @@ def send_broadcast_notification():
         if not title or not message:
             return jsonify({"error": "Title and message are required"}), 400
 
-        now = datetime.utcnow().isoformat()
+        now = utc_now_iso()
 
-        # Fetch target users
-        query = supabase.table("users").select("id")
-        
-        if target_role:
-            query = query.eq("role", target_role)
-        
-        query = query.eq("status", "active")
-        
-        users_res = query.execute()
-        users = users_res.data or []
-
-        if not users:
+        try:
+            # One INSERT ... SELECT in Postgres (see
+            # supabase/migrations/*_broadcast_notification.sql). Not retried:
+            # a lost response must not insert the broadcast twice.
+            broadcast_res = supabase.rpc("broadcast_notification", {
+                "p_title": title,
+                "p_message": message,
+                "p_role": target_role,
+                "p_created_at": now,
+            }).execute()
+            recipients = int(broadcast_res.data or 0)
+        except APIError as e:
+            # PGRST202: function not deployed yet
+            if e.code != "PGRST202":
+                raise
+            logger.warning("broadcast_notification RPC missing, inserting in batches")
+            recipients = _broadcast_in_batches(title, message, target_role, now)
+
+        if not recipients:
             return jsonify({"error": "No users found for broadcast"}), 404
 
-        # Create notifications in batch
-        notifications = [
-            {
-                "user_id": user["id"],
-                "title": title,
-                "message": message,
-                "type": "broadcast",
-                "read": False,
-                "created_at": now,
-            }
-            for user in users
-        ]
-
-        # Insert in batches of 100
-        batch_size = 100
-        for i in range(0, len(notifications), batch_size):
-            batch = notifications[i:i + batch_size]
-            supabase.table("notifications").insert(batch).execute()
-
         log_audit(
             "broadcast_sent",
             user_id=getattr(request, "admin_id", None),
             user_role="admin",
             entity_type="notification",
-            metadata={"recipients": len(users), "target_role": target_role},
+            metadata={"recipients": recipients, "target_role": target_role},
             req=request,
         )
         return jsonify({
             "success": True,
-            "message": f"Notification sent to {len(users)} users",
-            "recipients": len(users),
+            "message": f"Notification sent to {recipients} users",
+            "recipients": recipients,
         }), 200
 
     except Exception as e:
         logger.exception("Broadcast notification error")
-        traceback.print_exc()
         return jsonify({"error": str(e)}), 500
 
 
 # SYSTEM HEALTH CHECK
-# GET /api/admin/health
-@admin_bp.route("/admin/health", methods=["GET"])
-@require_admin
-def system_health():
-    """
-    Check system health and database connectivity
-    """
+# Last health probe, reused while younger than HEALTH_CACHE_SECONDS so
+# dashboard polling does not turn into one DB query per request
+HEALTH_CACHE_SECONDS = 2
+_health_lock = threading.Lock()
+_last_health = None  # (monotonic time, body, status)
+
+
+def _probe_health():
     try:
         # Test database connection
         test_res = supabase.table("users").select("id").limit(1).execute()
         db_status = "healthy" if test_res.data is not None else "unhealthy"
 
-        return jsonify({
+        return {
             "status": "ok",
             "database": db_status,
-            "timestamp": datetime.utcnow().isoformat(),
-        }), 200
+            "timestamp": utc_now_iso(),
+        }, 200
 
     except Exception as e:
-        return jsonify({
+        return {
             "status": "error",
             "database": "unhealthy",
             "error": str(e),
-            "timestamp": datetime.utcnow().isoformat(),
-        }), 500
+            "timestamp": utc_now_iso(),
+        }, 500
+
+
+# GET /api/admin/health
+@admin_bp.route("/admin/health", methods=["GET"])
+@require_admin
+def system_health():
+    """
+    Check system health and database connectivity
+    """
+    global _last_health
+
+    with _health_lock:
+        cached = _last_health
+        if cached is None or time.monotonic() - cached[0] >= HEALTH_CACHE_SECONDS:
+            body, status = _probe_health()
+            cached = _last_health = (time.monotonic(), orjson.dumps(body), status)
+
+    resp = raw_json(cached[1], cached[2])
+    resp.headers["Cache-Control"] = f"private, max-age={HEALTH_CACHE_SECONDS}"
+    return resp
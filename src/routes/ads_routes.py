@@ -1,20 +1,39 @@
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, request, jsonify, render_template
 from src.services.supabase_service import supabase
-from datetime import datetime
 from postgrest.exceptions import APIError
 import logging
-import traceback
+import threading
+import orjson
+from cachetools import TTLCache
 from flask_mail import Message
-from src.utils.mail_instance import mail
+from src.utils.mail_queue import send_async
+from src.utils.helpers import ojson, raw_json, utc_now_iso
 
 ads_bp = Blueprint("ads", __name__)
 logger = logging.getLogger(__name__)
 
+# Serialized /ads/active bodies keyed on placement; ads change minutes or
+# hours apart while rotators poll constantly
+ACTIVE_ADS_TTL = 30
+_active_ads_cache = TTLCache(maxsize=32, ttl=ACTIVE_ADS_TTL)
+_active_ads_lock = threading.Lock()
+
+
+# Bodies that never change, serialized once at import
+_ADS_TEST_BODY = orjson.dumps({"message": "Ads blueprint is working!", "route": "/api/ads/test"})
+_INQUIRY_FIELDS_REQUIRED_BODY = orjson.dumps({"error": "Company name, email and message are required"})
+_INQUIRY_NOT_FOUND_BODY = orjson.dumps({"error": "Inquiry not found"})
+
+
+def _clear_active_ads_cache():
+    with _active_ads_lock:
+        _active_ads_cache.clear()
+
 
 @ads_bp.route("/ads/test", methods=["GET"])
 def test_ads_route():
     """Test route to verify blueprint is registered"""
-    return jsonify({"message": "Ads blueprint is working!", "route": "/api/ads/test"}), 200
+    return raw_json(_ADS_TEST_BODY)
 
 
 @ads_bp.route("/ads/inquiries", methods=["POST"])
@@ -28,7 +47,7 @@ def create_ad_inquiry():
         message = data.get("message")
 
         if not company_name or not email or not message:
-            return jsonify({"error": "Company name, email and message are required"}), 400
+            return raw_json(_INQUIRY_FIELDS_REQUIRED_BODY, 400)
 
         payload = {
             "company_name": company_name,
@@ -36,7 +55,7 @@ def create_ad_inquiry():
             "contact_phone": phone,
             "message": message,
             "status": "pending",
-            "created_at": datetime.utcnow().isoformat(),
+            "created_at": utc_now_iso(),
         }
 
         result = supabase.table("ads_inquiries").insert(payload).execute()
@@ -44,10 +63,10 @@ def create_ad_inquiry():
         if not result.data:
             return jsonify({"error": "Failed to submit inquiry"}), 500
 
-        return jsonify({
+        return ojson({
             "message": "Ad inquiry submitted successfully",
             "inquiry": result.data[0],
-        }), 201
+        }, 201)
 
     except APIError as e:
         logger.exception("Supabase API error")
@@ -80,7 +99,7 @@ def get_ad_inquiries():
     try:
         status = (request.args.get("status") or "all").strip().lower()
         result = _fetch_inquiries(status)
-        return jsonify({"inquiries": result.data or []}), 200
+        return ojson({"inquiries": result.data or []})
     except Exception as e:
         logger.exception("Failed to fetch ad inquiries")
         return jsonify({"error": f"Server error: {str(e)}"}), 500
@@ -93,28 +112,38 @@ def get_admin_ad_inquiries():
 
 
 def _set_inquiry_status(inquiry_id: str, new_status: str):
-    now_iso = datetime.utcnow().isoformat()
+    now_iso = utc_now_iso()
 
+    # Update and read back the row in one round trip; inquiries without a
+    # contact email are left untouched
     inquiry_res = (
         supabase
         .table("ads_inquiries")
-        .select("*")
+        .update({
+            "status": new_status,
+            "updated_at": now_iso,
+        })
         .eq("id", inquiry_id)
-        .limit(1)
+        .not_.is_("contact_email", "null")
+        .neq("contact_email", "")
         .execute()
     )
 
     if not inquiry_res.data:
-        return jsonify({"error": "Inquiry not found"}), 404
-
-    inquiry = inquiry_res.data[0]
-    if not inquiry.get("contact_email"):
+        # Slow path only for errors: tell "missing" apart from "no email"
+        exists_res = (
+            supabase
+            .table("ads_inquiries")
+            .select("id")
+            .eq("id", inquiry_id)
+            .limit(1)
+            .execute()
+        )
+        if not exists_res.data:
+            return raw_json(_INQUIRY_NOT_FOUND_BODY, 404)
         return jsonify({"error": "Inquiry has no contact_email; cannot send automated message"}), 400
 
-    supabase.table("ads_inquiries").update({
-        "status": new_status,
-        "updated_at": now_iso,
-    }).eq("id", inquiry_id).execute()
+    inquiry = inquiry_res.data[0]
 
     payload = request.get_json(silent=True) or {}
     rejection_reason = payload.get("reason", "Your inquiry does not meet our current ad review criteria.")
@@ -125,32 +154,24 @@ def _set_inquiry_status(inquiry_id: str, new_status: str):
     email_sent = False
     email_error = None
 
-    # Send automated email based on decision
+    # Queue automated email based on decision (delivered by the background
+    # mail pool; email_sent means handed off, SMTP failures are logged there)
     try:
         if new_status == "rejected":
             msg = Message(
                 subject="Update on Your FoodShare Advertising Inquiry",
                 recipients=[inquiry.get("contact_email")],
             )
-            msg.body = f"""
-Hello {inquiry.get("company_name", "Partner")},
-
-Thank you for your interest in advertising with FoodShare.
-
-After review, your advertising inquiry was not approved at this time.
-Reason: {rejection_reason}
-
-You can submit a revised inquiry with additional details.
-
-Best regards,
-FoodShare Team
-"""
-            mail.send(msg)
-            logger.info(f"Ad inquiry rejection email sent to {inquiry.get('contact_email')}")
+            msg.body = render_template(
+                "email/ad_inquiry_rejected.txt",
+                company_name=inquiry.get("company_name", "Partner"),
+                reason=rejection_reason,
+            )
+            send_async(msg)
+            logger.info("Ad inquiry rejection email queued for %s", inquiry.get("contact_email"))
             email_sent = True
     except Exception as email_err:
-        logger.error(f"Failed to send rejection email for inquiry {inquiry_id}: {email_err}")
-        logger.error(traceback.format_exc())
+        logger.exception("Failed to queue rejection email for inquiry %s", inquiry_id)
         email_error = str(email_err)
 
     if new_status == "approved":
@@ -170,6 +191,7 @@ FoodShare Team
             ad_res = supabase.table("ads").insert(ad_payload).execute()
             if ad_res.data:
                 created_ad = ad_res.data[0]
+                _clear_active_ads_cache()
 
         try:
             msg = Message(
@@ -178,41 +200,23 @@ FoodShare Team
             )
 
             if created_ad:
-                msg.body = f"""
-Hello {inquiry.get("company_name", "Partner")},
-
-Great news! Your advertising inquiry has been approved and your ad is now active on FoodShare.
-
-Ad redirect URL: {redirect_url}
-Ad image URL: {image_url}
-
-Thank you for advertising with FoodShare.
-
-Best regards,
-FoodShare Team
-"""
+                msg.body = render_template(
+                    "email/ad_inquiry_approved.txt",
+                    company_name=inquiry.get("company_name", "Partner"),
+                    redirect_url=redirect_url,
+                    image_url=image_url,
+                )
             else:
-                msg.body = f"""
-Hello {inquiry.get("company_name", "Partner")},
-
-Your advertising inquiry has been approved.
-
-To activate your ad, please send us the following:
-1) Ad image URL
-2) Redirect URL (where users should go when they click your ad)
-
-You can reply with both links and we will publish your ad immediately.
+                msg.body = render_template(
+                    "email/ad_inquiry_needs_assets.txt",
+                    company_name=inquiry.get("company_name", "Partner"),
+                )
 
-Best regards,
-FoodShare Team
-"""
-
-            mail.send(msg)
-            logger.info(f"Ad inquiry approval email sent to {inquiry.get('contact_email')}")
+            send_async(msg)
+            logger.info("Ad inquiry approval email queued for %s", inquiry.get("contact_email"))
             email_sent = True
         except Exception as email_err:
-            logger.error(f"Failed to send approval email for inquiry {inquiry_id}: {email_err}")
-            logger.error(traceback.format_exc())
+            logger.exception("Failed to queue approval email for inquiry %s", inquiry_id)
             email_error = str(email_err)
 
     if not email_sent:
@@ -226,7 +230,7 @@ FoodShare Team
             "ad": created_ad,
         }), 502
 
-    return jsonify({
+    return ojson({
         "message": f"Inquiry {new_status}",
         "inquiry_id": inquiry_id,
         "status": new_status,
@@ -234,7 +238,7 @@ FoodShare Team
         "email_sent": email_sent,
         "email_error": email_error,
         "ad": created_ad,
-    }), 200
+    })
 
 
 @ads_bp.route("/admin/ads/inquiries/<inquiry_id>/approve", methods=["PATCH", "PUT"])
@@ -269,16 +273,27 @@ def reject_ad_inquiry_alias(inquiry_id):
 def get_active_ads():
     placement = request.args.get("placement")
 
-    query = (
-        supabase
-        .table("ads")
-        .select("*")
-        .eq("is_active", True)
-    )
+    with _active_ads_lock:
+        body = _active_ads_cache.get(placement)
+
+    if body is None:
+        query = (
+            supabase
+            .table("ads")
+            .select("*")
+            .eq("is_active", True)
+        )
+
+        if placement:
+            query = query.eq("placement", placement)
 
-    if placement:
-        query = query.eq("placement", placement)
+        result = query.execute()
+        body = orjson.dumps({"ads": result.data or []})
 
-    result = query.execute()
+        with _active_ads_lock:
+            _active_ads_cache[placement] = body
 
-    return jsonify({"ads": result.data or []}), 200
\ No newline at end of file
+    # A fresh Response per request; CORS headers are added to it afterwards
+    resp = raw_json(body)
+    resp.headers["Cache-Control"] = f"public, max-age={ACTIVE_ADS_TTL}"
+    return resp
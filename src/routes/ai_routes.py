@@ -1,12 +1,31 @@
 from flask import Blueprint, request, jsonify
+from src.utils.helpers import ojson
 import google.generativeai as genai
+import logging
 import os
+import threading
+from cachetools import TTLCache
 from dotenv import load_dotenv
 
 # Load environment variables
 load_dotenv()
 
 ai_bp = Blueprint("ai", __name__)
+logger = logging.getLogger(__name__)
+
+# Configure the SDK once per process instead of on every request
+GEMINI_API_KEY = os.getenv("YOUR_GEMINI_KEY")
+if GEMINI_API_KEY:
+    genai.configure(api_key=GEMINI_API_KEY)
+
+# Resolved model (list_models() is a network call) and recent suggestions,
+# keyed on the exact prompt inputs so repeated forms skip Gemini entirely
+_model_lock = threading.Lock()
+_model = None
+_model_name = None
+
+_suggestion_cache = TTLCache(maxsize=512, ttl=3600)
+_suggestion_lock = threading.Lock()
 
 
 def _resolve_supported_model_name():
@@ -40,6 +59,15 @@ def _resolve_supported_model_name():
 
     raise ValueError("No Gemini model supporting generateContent is available")
 
+def _get_model():
+    global _model, _model_name
+    with _model_lock:
+        if _model is None:
+            _model_name = _resolve_supported_model_name()
+            _model = genai.GenerativeModel(_model_name)
+        return _model, _model_name
+
+
 @ai_bp.route("/ai/suggest-description", methods=["POST"])
 def suggest_description():
     try:
@@ -48,13 +76,16 @@ def suggest_description():
         category = data.get("category", "")
         quantity = data.get("quantity", "")
 
-        api_key = os.getenv("YOUR_GEMINI_KEY")
-        if not api_key:
+        if not GEMINI_API_KEY:
             raise ValueError("Missing YOUR_GEMINI_KEY in .env file")
 
-        genai.configure(api_key=api_key)
-        model_name = _resolve_supported_model_name()
-        model = genai.GenerativeModel(model_name)
+        cache_key = (str(title), str(category), str(quantity))
+        with _suggestion_lock:
+            cached = _suggestion_cache.get(cache_key)
+        if cached:
+            return ojson(cached)
+
+        model, model_name = _get_model()
 
         prompt = (
             f"Write a short, kind description for a food donation titled '{title}'. "
@@ -68,8 +99,11 @@ def suggest_description():
         if not suggestion:
             raise ValueError("Gemini returned an empty response")
 
-        return jsonify({"suggestion": suggestion, "model": model_name})
+        result = {"suggestion": suggestion, "model": model_name}
+        with _suggestion_lock:
+            _suggestion_cache[cache_key] = result
+        return ojson(result)
 
     except Exception as e:
-        print("❌ AI Suggestion Error:", e)
+        logger.exception("AI suggestion error")
         return jsonify({"error": str(e)}), 500
@@ -1,27 +1,29 @@
-from flask import Blueprint, request, jsonify
-from werkzeug.security import generate_password_hash, check_password_hash
+from flask import Blueprint, request, jsonify, render_template
 from src.services.supabase_service import supabase
+from src.services.db_pool import db_enabled, fetch_one_prepared
 from postgrest.exceptions import APIError
-import jwt
 import os
-from datetime import datetime, timedelta
+from datetime import datetime, timezone
 import hashlib
+import hmac
 import logging
-import random
 import secrets
-from src.utils.password_utils import validate_password_strength
-from src.utils.jwt import decode_jwt, decode_request_token
+import threading
+from cachetools import TTLCache
+from src.utils.password_utils import (
+    hash_password,
+    password_needs_rehash,
+    validate_password_strength,
+    verify_password,
+)
+from src.utils.jwt import cached_decode_jwt, decode_request_token, encode_access_token
 from flask_mail import Message
-from src.utils.mail_instance import mail
+from src.utils.mail_queue import send_async
 from src.utils.validators import is_valid_email
 from src.utils.audit_log import log_audit
+from src.utils.helpers import utc_now, utc_now_iso
 
 
-logging.basicConfig(
-    level=logging.INFO,
-    format="%(asctime)s | %(levelname)s | %(message)s"
-)
-
 logger = logging.getLogger(__name__)
 
 
@@ -30,6 +32,60 @@ profile_bp = Blueprint("profile", __name__)
 
 JWT_SECRET = os.getenv("JWT_SECRET")
 
+# Key for OTP hashes. A 6-digit code that lives 10 minutes gains nothing from
+# a slow password KDF, so codes are stored as HMAC-SHA256 under this pepper.
+OTP_PEPPER = (os.getenv("OTP_PEPPER") or JWT_SECRET or "").encode()
+
+
+def _generate_otp():
+    """6-digit code from the OS CSPRNG (random.randint is predictable)."""
+    return f"{secrets.randbelow(900000) + 100000:06d}"
+
+
+def _hash_otp(user_id, otp):
+    """HMAC of the code bound to its user, so equal codes hash differently per user."""
+    return hmac.new(OTP_PEPPER, f"{user_id}:{otp}".encode(), hashlib.sha256).hexdigest()
+
+
+# Users this worker sent a password-change code in the last
+# OTP_COOLDOWN_SECONDS. Answers repeat clicks without a query; the latest
+# password_change_codes row stays the authority across workers and restarts.
+OTP_COOLDOWN_SECONDS = 30
+_otp_cooldown = TTLCache(maxsize=50000, ttl=OTP_COOLDOWN_SECONDS)
+_otp_cooldown_lock = threading.Lock()
+
+
+def _otp_cooldown_active(user_id):
+    """True if a code was issued to the user less than OTP_COOLDOWN_SECONDS ago."""
+    with _otp_cooldown_lock:
+        if user_id in _otp_cooldown:
+            return True
+
+    latest = (
+        supabase.table("password_change_codes")
+        .select("created_at")
+        .eq("user_id", user_id)
+        .order("created_at", desc=True)
+        .limit(1)
+        .execute()
+    ).data
+    if not latest:
+        return False
+    issued = _parse_db_timestamp(latest[0]["created_at"])
+    return (utc_now() - issued).total_seconds() < OTP_COOLDOWN_SECONDS
+
+
+def _start_otp_cooldown(user_id):
+    """Remember a code was just issued (call after it is stored and queued)."""
+    with _otp_cooldown_lock:
+        _otp_cooldown[user_id] = True
+
+
+def _parse_db_timestamp(value):
+    """Aware UTC datetime from a PostgREST timestamp (naive values are UTC)."""
+    parsed = datetime.fromisoformat(value)
+    return parsed if parsed.tzinfo else parsed.replace(tzinfo=timezone.utc)
+
 
 def _require_auth_payload():
     payload = decode_request_token(request)
@@ -38,22 +94,93 @@ def _require_auth_payload():
 
     return payload, None
 
+def _select_one(table, columns, column, value):
+    """
+    First row of `table` where `column` = value. Uses the pooled direct
+    connection when SUPABASE_DB_URL is set, PostgREST otherwise. Table and
+    column names are module constants, never request input.
+    """
+    if db_enabled():
+        return fetch_one_prepared(
+            f"select {columns} from public.{table} where {column} = $1",
+            (value,),
+        )
+
+    rows = (
+        supabase
+        .table(table)
+        .select(columns)
+        .eq(column, value)
+        .limit(1)
+        .execute()
+    ).data
+    return rows[0] if rows else None
+
+
+# Only the columns login reads
+LOGIN_USER_COLUMNS = "id, email, full_name, role, status, password_hash"
+
+
+def _fetch_user_by_email(email):
+    return _select_one("users", LOGIN_USER_COLUMNS, "email", email)
+
+
+PROFILE_USER_COLUMNS = "id, full_name, email, phone, role, status, created_at"
+
+
+def _fetch_profile(user_id):
+    """
+    (user, organization) for a profile, with the organization embedded
+    (through organizations.user_id) in one round trip instead of a second
+    lookup for NGOs. user is None when it does not exist; organization is
+    the user's first organization row or None.
+    """
+    if db_enabled():
+        user = fetch_one_prepared(
+            f"select {PROFILE_USER_COLUMNS}, "
+            "coalesce((select json_agg(o) from public.organizations o "
+            "where o.user_id = u.id), '[]'::json) as organizations "
+            "from public.users u where u.id = $1",
+            (user_id,),
+        )
+    else:
+        rows = (
+            supabase
+            .table("users")
+            .select(f"{PROFILE_USER_COLUMNS}, organizations(*)")
+            .eq("id", user_id)
+            .limit(1)
+            .execute()
+        ).data
+        user = rows[0] if rows else None
+
+    if not user:
+        return None, None
+
+    # PostgREST embeds an object instead of an array when
+    # organizations.user_id is unique (one-to-one); json_agg is always a list
+    organizations = user.pop("organizations", None)
+    if isinstance(organizations, dict):
+        return user, organizations
+    return user, (organizations[0] if organizations else None)
+
+
 # REGISTER ENDPOINT (Handles both Donor and NGO)
+# Body keys read by register_user, in unpacking order
+REGISTER_FIELDS = ("email", "password", "full_name", "phone", "role", "address", "description")
+
+
 @auth_bp.route("/register", methods=["POST"])
 def register_user():
     try:
-        data = request.get_json()
+        data = request.get_json(silent=True) or {}
 
-        email = data.get("email")
-        password = data.get("password")
-        full_name = data.get("full_name")
-        phone = data.get("phone")
-        role = data.get("role")
-        address = data.get("address")
-        description = data.get("description")
+        email, password, full_name, phone, role, address, description = map(
+            data.get, REGISTER_FIELDS
+        )
 
         # Required fields
-        if not all([email, password, full_name, role]):
+        if not (email and password and full_name and role):
             log_audit(
                 "register_failed",
                 user_role=role,
@@ -88,7 +215,7 @@ def register_user():
 
         # NGO-specific validation (MUST be before insert)
         if role == "ngo":
-            if not all([address, description, phone]):
+            if not (address and description and phone):
                 log_audit(
                     "register_failed",
                     user_role=role,
@@ -99,36 +226,36 @@ def register_user():
                 return jsonify({"error": "Missing NGO organization fields"}), 400
 
         # Hash password
-        hashed_pw = generate_password_hash(password)
+        hashed_pw = hash_password(password)
 
         # Correct status
         status = "pending" if role == "ngo" else "active"
 
-        # Insert user
-        user_response = supabase.table("users").insert({
-            "email": email,
-            "password_hash": hashed_pw,
-            "full_name": full_name,
-            "phone": phone,
-            "role": role,
-            "status": status
+        # Insert user (and the organization for NGOs) in one transaction; a
+        # null id means the email is already registered
+        # (see supabase/migrations/*_register_user_tx*.sql)
+        user_response = supabase.rpc("register_user_tx", {
+            "p_email": email,
+            "p_password_hash": hashed_pw,
+            "p_full_name": full_name,
+            "p_phone": phone,
+            "p_role": role,
+            "p_status": status,
+            "p_address": address,
+            "p_description": description,
         }).execute()
 
         if not user_response.data:
-            return jsonify({"error": "Failed to register user"}), 500
-
-        user_id = user_response.data[0]["id"]
+            log_audit(
+                "register_failed",
+                user_role=role,
+                entity_type="user",
+                metadata={"email": email, "reason": "email_exists"},
+                req=request,
+            )
+            return jsonify({"error": "Email already exists"}), 409
 
-        # Insert organization ONLY for NGO
-        if role == "ngo":
-            supabase.table("organizations").insert({
-                "user_id": user_id,
-                "name": full_name,
-                "address": address,
-                "description": description,
-                "phone": phone,
-                "verification_status": "pending"
-            }).execute()
+        user_id = user_response.data
 
         log_audit(
             "register_successful",
@@ -147,15 +274,24 @@ def register_user():
         }), 201
 
     except APIError as e:
+        # Unique violation the RPC's ON CONFLICT did not absorb
+        if e.code == "23505":
+            log_audit(
+                "register_failed",
+                user_role=data.get("role"),
+                entity_type="user",
+                metadata={"email": data.get("email"), "reason": "email_exists"},
+                req=request,
+            )
+            return jsonify({"error": "Email already exists"}), 409
+
         log_audit(
             "register_failed",
-            user_role=(request.get_json(silent=True) or {}).get("role"),
+            user_role=data.get("role"),
             entity_type="user",
             metadata={"reason": "api_error", "error": str(e)},
             req=request,
         )
-        if "duplicate key" in str(e).lower():
-            return jsonify({"error": "Email already exists"}), 409
         return jsonify({"error": "Database error occurred"}), 500
 
 
@@ -163,11 +299,11 @@ def register_user():
 @auth_bp.route("/login", methods=["POST"])
 def login_user():
     try:
-        data = request.get_json()
+        data = request.get_json(silent=True) or {}
         email = data.get("email")
         password = data.get("password")
 
-        if not all([email, password]):
+        if not (email and password):
             log_audit(
                 "login_unsuccessful",
                 entity_type="user",
@@ -177,16 +313,9 @@ def login_user():
             return jsonify({"error": "Email and password are required"}), 400
 
         # Query user by email
-        user = (
-            supabase
-            .table("users")
-            .select("*")
-            .eq("email", email)
-            .single()
-            .execute()
-        )
+        user = _fetch_user_by_email(email)
 
-        if not user.data:
+        if not user:
             log_audit(
                 "login_unsuccessful",
                 entity_type="user",
@@ -196,21 +325,21 @@ def login_user():
             return jsonify({"error": "Invalid email or password"}), 401
 
         # Verify password
-        if not check_password_hash(user.data["password_hash"], password):
+        if not verify_password(user["password_hash"], password):
             log_audit(
                 "login_unsuccessful",
-                user_id=user.data.get("id"),
-                user_role=user.data.get("role"),
+                user_id=user.get("id"),
+                user_role=user.get("role"),
                 entity_type="user",
-                entity_id=user.data.get("id"),
+                entity_id=user.get("id"),
                 metadata={"email": email, "reason": "wrong_password"},
                 req=request,
             )
             return jsonify({"error": "Invalid email or password"}), 401
 
         # Block inactive / suspended accounts
-        if user.data.get("status") != "active":
-            account_status = str(user.data.get("status") or "").lower()
+        if user.get("status") != "active":
+            account_status = str(user.get("status") or "").lower()
             if account_status == "suspended":
                 error_message = "Your account has been suspended. Please contact support."
             elif account_status == "pending":
@@ -220,10 +349,10 @@ def login_user():
 
             log_audit(
                 "login_unsuccessful",
-                user_id=user.data.get("id"),
-                user_role=user.data.get("role"),
+                user_id=user.get("id"),
+                user_role=user.get("role"),
                 entity_type="user",
-                entity_id=user.data.get("id"),
+                entity_id=user.get("id"),
                 metadata={"email": email, "reason": "inactive_account", "status": account_status},
                 req=request,
             )
@@ -231,35 +360,41 @@ def login_user():
                 "error": error_message
             }), 403
 
+        # Upgrade hashes made with an older method/cost while the plain
+        # password is at hand; a failure here must not block the login
+        if password_needs_rehash(user["password_hash"]):
+            try:
+                supabase.table("users") \
+                    .update({"password_hash": hash_password(password)}) \
+                    .eq("id", user["id"]) \
+                    .execute()
+            except Exception:
+                logger.exception("Password rehash failed for user %s", user["id"])
+
         # Generate JWT token
-        token = jwt.encode(
-            {
-                "user_id": user.data["id"],
-                "email": user.data["email"],
-                "role": user.data["role"],
-                "exp": datetime.utcnow() + timedelta(hours=12)
-            },
-            JWT_SECRET,
-            algorithm="HS256"
-        )
+        token = encode_access_token({
+            "user_id": user["id"],
+            "email": user["email"],
+            "role": user["role"],
+        })
 
         log_audit(
             "login_successful",
-            user_id=user.data.get("id"),
-            user_role=user.data.get("role"),
+            user_id=user.get("id"),
+            user_role=user.get("role"),
             entity_type="user",
-            entity_id=user.data.get("id"),
-            metadata={"email": user.data.get("email")},
+            entity_id=user.get("id"),
+            metadata={"email": user.get("email")},
             req=request,
         )
         return jsonify({
             "message": "Login successful",
             "token": token,
             "donor": {
-                "id": user.data["id"],
-                "full_name": user.data["full_name"],
-                "email": user.data["email"],
-                "role": user.data["role"]
+                "id": user["id"],
+                "full_name": user["full_name"],
+                "email": user["email"],
+                "role": user["role"]
             }
         }), 200
 
@@ -300,17 +435,15 @@ def get_donor_profile(donor_id):
         if payload.get("role") != "admin" and payload.get("user_id") != donor_id:
             return jsonify({"error": "Forbidden"}), 403
 
-        response = supabase.table("users").select(
-            "id, full_name, email, phone, role, status"
-        ).eq("id", donor_id).single().execute()
+        donor = _select_one("users", "id, full_name, email, phone, role, status", "id", donor_id)
 
-        if not response.data:
+        if not donor:
             return jsonify({"error": "Donor not found"}), 404
 
-        return jsonify(response.data), 200
+        return jsonify(donor), 200
 
     except Exception as e:
-        print("⚠️ Error fetching donor profile:", e)
+        logger.exception("Error fetching donor profile")
         return jsonify({"error": str(e)}), 500
 
 
@@ -321,33 +454,24 @@ def get_profile():
         if auth_error:
             return auth_error
 
-        user_id = request.args.get("userId")
+        # userId is optional; without it the caller's own profile is served
+        user_id = request.args.get("userId") or payload.get("user_id")
 
         if not user_id:
             return jsonify({"error": "Missing userId"}), 400
         if payload.get("role") != "admin" and payload.get("user_id") != user_id:
             return jsonify({"error": "Forbidden"}), 403
 
-        user_res = supabase.table("users") \
-            .select("id, full_name, email, phone, role, status, created_at") \
-            .eq("id", user_id) \
-            .execute()
+        user, organization = _fetch_profile(user_id)
 
-        if not user_res.data:
+        if not user:
             return jsonify({"error": "User not found"}), 404
 
-        user = user_res.data[0] # SAFE
-
         if user["role"] == "ngo":
-            org_res = supabase.table("organizations") \
-                .select("*") \
-                .eq("user_id", user_id) \
-                .execute()
-
             return jsonify({
                 "type": "ngo",
                 "user": user,
-                "organization": org_res.data[0] if org_res.data else None
+                "organization": organization
             }), 200
 
         return jsonify({
@@ -359,6 +483,10 @@ def get_profile():
         return jsonify({"error": str(e)}), 500
 
 
+# users columns a profile PATCH may change
+PROFILE_EDITABLE_FIELDS = ("full_name", "email", "phone")
+
+
 @auth_bp.route("/profile", methods=["PATCH"])
 def update_profile():
     try:
@@ -366,8 +494,8 @@ def update_profile():
         if auth_error:
             return auth_error
 
-        data = request.get_json()
-        logger.info(f"PATCH /profile payload: {data}")
+        data = request.get_json(silent=True) or {}
+        logger.debug("PATCH /profile payload: %s", data)
 
         user_id = data.get("userId")
 
@@ -377,16 +505,13 @@ def update_profile():
         if payload.get("role") != "admin" and payload.get("user_id") != user_id:
             return jsonify({"error": "Forbidden"}), 403
 
-        update_fields = {
-            k: v for k, v in data.items()
-            if k in ["full_name", "email", "phone"]
-        }
+        update_fields = {k: data[k] for k in PROFILE_EDITABLE_FIELDS if k in data}
 
         if not update_fields:
-            logger.warning(f"No fields to update for userId={user_id}")
+            logger.warning("No fields to update for userId=%s", user_id)
             return jsonify({"error": "No fields to update"}), 400
 
-        logger.info(f"Updating user {user_id} with {update_fields}")
+        logger.debug("Updating user %s with %s", user_id, update_fields)
 
         supabase.table("users") \
             .update(update_fields) \
@@ -402,7 +527,7 @@ def update_profile():
             req=request,
         )
 
-        logger.info(f"Profile updated successfully for userId={user_id}")
+        logger.info("Profile updated successfully for userId=%s", user_id)
         return jsonify({"message": "Profile updated successfully"}), 200
 
     except Exception as e:
@@ -418,15 +543,20 @@ def request_password_change():
         return jsonify({"error": "Missing token"}), 401
 
     token = auth_header.split(" ")[1]
-    payload = decode_jwt(token)
+    payload = cached_decode_jwt(token)
 
     if not payload:
         return jsonify({"error": "Invalid or expired token"}), 401
 
     user_id = payload["user_id"]
 
+    if _otp_cooldown_active(user_id):
+        return jsonify({
+            "error": "Please wait before requesting another code"
+        }), 429
+
     # Body
-    data = request.get_json()
+    data = request.get_json(silent=True) or {}
     current_password = data.get("current_password")
     new_password = data.get("new_password")
 
@@ -434,24 +564,17 @@ def request_password_change():
         return jsonify({"error": "All fields are required"}), 400
 
     # Fetch user
-    user = (
-        supabase
-        .table("users")
-        .select("email, password_hash")
-        .eq("id", user_id)
-        .single()
-        .execute()
-    )
+    user = _select_one("users", "email, password_hash", "id", user_id)
 
-    if not user.data:
+    if not user:
         return jsonify({"error": "User not found"}), 404
 
     # Verify current password
-    if not check_password_hash(user.data["password_hash"], current_password):
+    if not verify_password(user["password_hash"], current_password):
         return jsonify({"error": "Current password is incorrect"}), 400
     
     # .5 BLOCK same password (UX + security consistency)
-    if check_password_hash(user.data["password_hash"], new_password):
+    if verify_password(user["password_hash"], new_password):
         return jsonify({
         "error": "New password must be different from your current password"
     }), 400
@@ -468,37 +591,24 @@ def request_password_change():
         .execute()
 
     # Generate OTP
-    otp = str(random.randint(100000, 999999))
-    otp_hash = generate_password_hash(otp)
-    expires_at = datetime.utcnow() + timedelta(minutes=10)
+    otp = _generate_otp()
+    otp_hash = _hash_otp(user_id, otp)
 
-    # Store OTP (invalidate previous codes implicitly by only using latest)
+    # Store OTP (invalidate previous codes implicitly by only using latest);
+    # created_at / expires_at (+10 min) default to the database clock
     supabase.table("password_change_codes").insert({
         "user_id": user_id,
         "code_hash": otp_hash,
-        "expires_at": expires_at.isoformat(),
-        "created_at": datetime.utcnow().isoformat()
     }).execute()
 
     # Send email
     msg = Message(
         subject="FoodShare Password Change Verification Code",
-        recipients=[user.data["email"]],
+        recipients=[user["email"]],
     )
-    msg.body = f"""
-Hello,
-
-You requested to change your password.
-
-Your verification code is: {otp}
-
-This code will expire in 10 minutes.
-
-If you did not request this change, please ignore this email.
-
-– FoodShare Security Team
-"""
-    mail.send(msg)
+    msg.body = render_template("email/password_change_code.txt", otp=otp)
+    send_async(msg)
+    _start_otp_cooldown(user_id)
 
     log_audit(
         "password_change_requested",
@@ -521,7 +631,7 @@ def verify_password_change():
         return jsonify({"error": "Missing token"}), 401
 
     token = auth_header.split(" ")[1]
-    payload = decode_jwt(token)
+    payload = cached_decode_jwt(token)
 
     if not payload:
         return jsonify({"error": "Invalid or expired token"}), 401
@@ -529,53 +639,40 @@ def verify_password_change():
     user_id = payload["user_id"]
 
     # Body
-    data = request.get_json()
+    data = request.get_json(silent=True) or {}
     code = data.get("code")
     new_password = data.get("new_password")
 
     if not code or not new_password:
         return jsonify({"error": "Code and new password are required"}), 400
 
-    # Fetch latest OTP
-    otp_record = (
-        supabase
-        .table("password_change_codes")
-        .select("*")
-        .eq("user_id", user_id)
-        .order("created_at", desc=True)
-        .limit(1)
-        .execute()
-    )
-
-    if not otp_record.data:
-        return jsonify({"error": "No verification code found"}), 400
-
-    otp_data = otp_record.data[0]
-
-    # Expiry check
-    expires_at = datetime.fromisoformat(otp_data["expires_at"])
-    if datetime.utcnow() > expires_at:
-        return jsonify({"error": "Verification code has expired"}), 400
-
-    # Verify OTP
-    if not check_password_hash(otp_data["code_hash"], code):
-        return jsonify({"error": "Invalid verification code"}), 400
-
-    # Fetch current password hash
-    user = (
+    # Fetch the user's password hash and the matching unexpired OTP in one
+    # request. Codes are deterministic HMACs, so the match happens in the
+    # database on the (user_id, code_hash) index instead of in Python.
+    user_res = (
         supabase
         .table("users")
-        .select("password_hash")
+        .select("password_hash, password_change_codes(id)")
         .eq("id", user_id)
-        .single()
+        .eq("password_change_codes.code_hash", _hash_otp(user_id, str(code)))
+        .gt("password_change_codes.expires_at", utc_now_iso())
+        .limit(1, foreign_table="password_change_codes")
         .execute()
     )
 
-    if not user.data:
+    if not user_res.data:
         return jsonify({"error": "User not found"}), 404
 
+    user = user_res.data[0]
+    codes = user.get("password_change_codes") or []
+
+    if not codes:
+        return jsonify({"error": "Invalid or expired verification code"}), 400
+
+    otp_data = codes[0]
+
     # BLOCK reusing old password
-    if check_password_hash(user.data["password_hash"], new_password):
+    if verify_password(user["password_hash"], new_password):
         return jsonify({
             "error": "New password must be different from your current password"
         }), 400
@@ -585,18 +682,17 @@ def verify_password_change():
     if strength_error:
         return jsonify({"error": strength_error}), 400
 
-    # Update password
-    new_hash = generate_password_hash(new_password)
-    supabase.table("users") \
-        .update({"password_hash": new_hash}) \
-        .eq("id", user_id) \
-        .execute()
+    # Delete the OTP (one-time use) and update the password in one
+    # transaction (see supabase/migrations/*_consume_password_change_otp.sql)
+    new_hash = hash_password(new_password)
+    consumed = supabase.rpc("consume_password_change_otp", {
+        "p_user_id": user_id,
+        "p_code_id": otp_data["id"],
+        "p_password_hash": new_hash,
+    }).execute()
 
-    # Invalidate OTP (one-time use)
-    supabase.table("password_change_codes") \
-        .delete() \
-        .eq("id", otp_data["id"]) \
-        .execute()
+    if not consumed.data:
+        return jsonify({"error": "Verification code has expired"}), 400
 
     log_audit(
         "password_changed",
@@ -621,7 +717,7 @@ def resend_password_otp():
         return jsonify({"error": "Missing token"}), 401
 
     token = auth_header.split(" ")[1]
-    payload = decode_jwt(token)
+    payload = cached_decode_jwt(token)
 
     if not payload:
         return jsonify({"error": "Invalid or expired token"}), 401
@@ -629,68 +725,40 @@ def resend_password_otp():
     user_id = payload["user_id"]
 
     # Fetch user email
-    user = supabase.table("users") \
-        .select("email") \
-        .eq("id", user_id) \
-        .single() \
-        .execute()
+    user = _select_one("users", "email", "id", user_id)
 
-    if not user.data:
+    if not user:
         return jsonify({"error": "User not found"}), 404
 
-    # Fetch latest OTP
-    otp_record = supabase.table("password_change_codes") \
-        .select("*") \
+    # 30s cooldown between codes
+    if _otp_cooldown_active(user_id):
+        return jsonify({
+            "error": "Please wait before resending the code"
+        }), 429
+
+    # Invalidate previous OTP
+    supabase.table("password_change_codes") \
+        .delete() \
         .eq("user_id", user_id) \
-        .order("created_at", desc=True) \
-        .limit(1) \
         .execute()
 
-    if otp_record.data:
-        last_created = datetime.fromisoformat(
-            otp_record.data[0]["created_at"]
-        )
-        # s cooldown
-        if datetime.utcnow() - last_created < timedelta(seconds=30):
-            return jsonify({
-                "error": "Please wait before resending the code"
-            }), 429
-
-        # Invalidate previous OTP
-        supabase.table("password_change_codes") \
-            .delete() \
-            .eq("user_id", user_id) \
-            .execute()
-
     # Generate new OTP
-    otp = str(random.randint(100000, 999999))
-    otp_hash = generate_password_hash(otp)
-    expires_at = datetime.utcnow() + timedelta(minutes=10)
+    otp = _generate_otp()
+    otp_hash = _hash_otp(user_id, otp)
 
     supabase.table("password_change_codes").insert({
         "user_id": user_id,
         "code_hash": otp_hash,
-        "expires_at": expires_at.isoformat(),
-        "created_at": datetime.utcnow().isoformat()
     }).execute()
 
     # Send email
     msg = Message(
         subject="FoodShare Password Change Verification Code",
-        recipients=[user.data["email"]],
+        recipients=[user["email"]],
     )
-    msg.body = f"""
-Hello,
-
-Your new verification code is: {otp}
-
-This code will expire in 10 minutes.
-
-If you did not request this, please ignore this email.
-
-– FoodShare Security Team
-"""
-    mail.send(msg)
+    msg.body = render_template("email/password_change_code_resent.txt", otp=otp)
+    send_async(msg)
+    _start_otp_cooldown(user_id)
 
     log_audit(
         "password_change_otp_resent",
@@ -713,7 +781,7 @@ def delete_account():
         if auth_error:
             return auth_error
 
-        data = request.get_json()
+        data = request.get_json(silent=True) or {}
         user_id = data.get("userId")
 
         if not user_id:
@@ -721,41 +789,14 @@ def delete_account():
         if payload.get("role") != "admin" and payload.get("user_id") != user_id:
             return jsonify({"error": "Forbidden"}), 403
 
-        # Check user exists
-        user = supabase.table("users") \
-            .select("id") \
-            .eq("id", user_id) \
-            .execute()
+        # Anonymise donations (keep history), delete related rows and the
+        # user in one transaction; returns null when the user does not exist
+        # (see supabase/migrations/*_delete_user_cascade.sql)
+        deleted = supabase.rpc("delete_user_cascade", {"p_user_id": user_id}).execute()
 
-        if not user.data:
+        if not deleted.data:
             return jsonify({"error": "User not found"}), 404
 
-        # Anonymise donations (keep history)
-        supabase.table("food_donations") \
-            .update({
-                "donor_id": None
-            }) \
-            .eq("donor_id", user_id) \
-            .execute()
-
-        # Delete notifications
-        supabase.table("notifications") \
-            .delete() \
-            .eq("user_id", user_id) \
-            .execute()
-
-        # Delete password reset codes
-        supabase.table("password_change_codes") \
-            .delete() \
-            .eq("user_id", user_id) \
-            .execute()
-
-        # Delete user account
-        supabase.table("users") \
-            .delete() \
-            .eq("id", user_id) \
-            .execute()
-
         log_audit(
             "account_deleted",
             user_id=user_id,
@@ -765,7 +806,7 @@ def delete_account():
             req=request,
         )
 
-        logger.info(f"✅ Account deleted userId={user_id}")
+        logger.info("✅ Account deleted userId=%s", user_id)
 
         return jsonify({"message": "Account deleted successfully"}), 200
 
@@ -776,7 +817,6 @@ def delete_account():
 
 @auth_bp.route("/organizations/<org_id>", methods=["PATCH"])
 def update_organization(org_id):
-    import traceback
     try:
         payload, auth_error = _require_auth_payload()
         if auth_error:
@@ -797,7 +837,7 @@ def update_organization(org_id):
         if payload.get("role") != "admin" and payload.get("user_id") != org.get("user_id"):
             return jsonify({"error": "Forbidden"}), 403
 
-        data = request.get_json() or {}
+        data = request.get_json(silent=True) or {}
 
         update_payload = {
             "name": data.get("name"),
@@ -840,28 +880,23 @@ def forgot_password():
         data = request.get_json(silent=True) or {}
         email = data.get("email")
 
-        # Always return generic success (security best practice)
-        if not email:
+        # Always return generic success (security best practice); malformed
+        # addresses cannot match an account, so skip the lookup for them
+        if not is_valid_email(email):
             return jsonify({
                 "message": "If the account exists, a reset link will be sent"
             }), 200
 
         # Find user
-        user_res = (
-            supabase.table("users")
-            .select("id")
-            .eq("email", email)
-            .maybe_single()
-            .execute()
-        )
+        user = _select_one("users", "id", "email", email)
 
-        if not user_res.data:
+        if not user:
             # Do NOT reveal user existence
             return jsonify({
                 "message": "If the account exists, a reset link will be sent"
             }), 200
 
-        user_id = user_res.data["id"]
+        user_id = user["id"]
 
         # Generate secure reset token
         raw_token = secrets.token_urlsafe(48)
@@ -873,13 +908,10 @@ def forgot_password():
             .eq("user_id", user_id) \
             .execute()
 
-        # Store new reset token
+        # Store new reset token (expires_at defaults to now() + 30 min)
         supabase.table("password_resets").insert({
             "user_id": user_id,
             "token_hash": token_hash,
-            "expires_at": (
-                datetime.utcnow() + timedelta(minutes=30)
-            ).isoformat(),
             "used": False
         }).execute()
 
@@ -894,21 +926,8 @@ def forgot_password():
             subject="Reset your FoodShare password",
             recipients=[email],
         )
-        msg.body = f"""
-Hello,
-
-You requested to reset your FoodShare password.
-
-Click the link below to reset it:
-{reset_link}
-
-This link will expire in 30 minutes.
-
-If you did not request this, please ignore this email.
-
-– FoodShare Security Team
-"""
-        mail.send(msg)
+        msg.body = render_template("email/password_reset_link.txt", reset_link=reset_link)
+        send_async(msg)
         log_audit(
             "forgot_password_requested",
             user_id=user_id,
@@ -932,7 +951,7 @@ If you did not request this, please ignore this email.
 
 @auth_bp.route("/auth/reset-password", methods=["POST"])
 def reset_password():
-    data = request.get_json()
+    data = request.get_json(silent=True) or {}
     token = data.get("token")
     new_password = data.get("password")
 
@@ -941,27 +960,15 @@ def reset_password():
 
     token_hash = hashlib.sha256(token.encode()).hexdigest()
 
-    reset_res = (
-        supabase.table("password_resets")
-        .select("id, user_id, expires_at, used")
-        .eq("token_hash", token_hash)
-        .maybe_single()
-        .execute()
-    )
+    reset = _select_one("password_resets", "id, user_id, expires_at, used", "token_hash", token_hash)
 
-    if not reset_res.data:
+    if not reset:
         return jsonify({"error": "Invalid or expired token"}), 400
 
-    reset = reset_res.data
-
     if reset["used"]:
         return jsonify({"error": "Token already used"}), 400
 
-    expires_at = datetime.fromisoformat(reset["expires_at"])
-
-    if expires_at < datetime.utcnow().replace(tzinfo=expires_at.tzinfo):
-
-
+    if _parse_db_timestamp(reset["expires_at"]) < utc_now():
         return jsonify({"error": "Token expired"}), 400
 
     strength_error = validate_password_strength(new_password)
@@ -969,7 +976,7 @@ def reset_password():
         return jsonify({"error": strength_error}), 400
 
     # Update password
-    hashed_pw = generate_password_hash(new_password)
+    hashed_pw = hash_password(new_password)
 
     supabase.table("users").update({
         "password_hash": hashed_pw
@@ -1,13 +1,15 @@
 from flask import Blueprint, request, jsonify
 from src.services.supabase_service import supabase
 from flask_mail import Message
-from src.utils.mail_instance import mail
+from src.utils.mail_queue import send_async
 from src.utils.audit_log import log_audit
 from src.utils.jwt import decode_request_token
+from src.utils.helpers import ojson, utc_now_iso
 import traceback
 import qrcode
 import io
 import base64
+import threading
 import time
 from datetime import date, datetime, timedelta
 
@@ -238,8 +240,8 @@ def add_donation():
             "pickup_instructions": pickup_instructions,
             "status": "available",
             "urgency": urgency,
-            "created_at": datetime.utcnow().isoformat(),
-            "updated_at": datetime.utcnow().isoformat(),
+            "created_at": utc_now_iso(),
+            "updated_at": utc_now_iso(),
         }
 
         result = _execute_with_retry(lambda: supabase.table("food_donations").insert(donation))
@@ -266,7 +268,7 @@ def add_donation():
                     "message": f"Your donation '{title}' has been created with a pickup QR code for NGO verification.",
                     "type": "status_update",
                     "read": False,
-                    "created_at": datetime.utcnow().isoformat(),
+                    "created_at": utc_now_iso(),
                 })
             )
         except Exception as notification_err:
@@ -291,7 +293,7 @@ def add_donation():
                     ),
                 )
                 msg.attach("pickup_qr.png", "image/png", buf.getvalue())
-                mail.send(msg)
+                send_async(msg)
         except Exception as email_err:
             print("Email sending failed:", email_err)
 
@@ -426,7 +428,7 @@ def update_donation(donation_id):
                 "error": "No valid fields to update"
             }), 400
 
-        update_data["updated_at"] = datetime.utcnow().isoformat()
+        update_data["updated_at"] = utc_now_iso()
 
         # Perform update
         result = (
@@ -476,7 +478,7 @@ def list_donations(donor_id):
         data = response.data or []
 
         # debugging info
-        return jsonify({"data": data}), 200
+        return ojson({"data": data})
 
     except Exception as e:
         print("⚠️ list_donations error:", e)
@@ -497,7 +499,7 @@ def list_donations(donor_id):
 @donation_bp.route("/donations/<donation_id>/cancel", methods=["PUT"])
 def cancel_donation(donation_id):
     try:
-        now = datetime.utcnow().isoformat()
+        now = utc_now_iso()
 
 
         # Fetch existing donation (GUARD)
@@ -577,7 +579,7 @@ def cancel_donation(donation_id):
                         f"The FoodShare Team 🌱"
                     ),
                 )
-                mail.send(msg)
+                send_async(msg)
 
         except Exception as email_err:
             print("⚠️ Email sending failed (cancel donation):", email_err)
@@ -617,7 +619,7 @@ def auto_expire_donations():
     """
     try:
         today = date.today().isoformat()
-        now = datetime.utcnow().isoformat()
+        now = utc_now_iso()
 
 
 
@@ -638,6 +640,7 @@ def auto_expire_donations():
             return jsonify({"message": "No donations to expire today"}), 200
 
         expired_count = 0
+        messages = []
 
         for donation in to_expire.data:
             donation_id = donation["id"]
@@ -676,7 +679,7 @@ def auto_expire_donations():
                 )
 
                 if donor.data and donor.data.get("email"):
-                    msg = Message(
+                    messages.append(Message(
                         subject="⚠️ Donation Expired - FoodShare",
                         recipients=[donor.data["email"]],
                         body=(
@@ -688,15 +691,17 @@ def auto_expire_donations():
                             f"Warm regards,\n"
                             f"The FoodShare Team"
                         ),
-                    )
-                    mail.send(msg)
+                    ))
 
             except Exception as email_err:
                 print(
-                    f"⚠️ Email sending failed for expired donation {donation_id}:",
+                    f"⚠️ Email preparation failed for expired donation {donation_id}:",
                     email_err,
                 )
 
+        # Expiry emails go out in the background over one SMTP session
+        send_async(*messages)
+
         print(f"✅ {expired_count} donations marked as expired.")
         log_audit(
             "donations_expired_auto",
@@ -715,8 +720,26 @@ def auto_expire_donations():
         return jsonify({"error": str(e)}), 500
 
 # Send Reminder Notifications for Expiring Donations
-@donation_bp.route("/donations/send-reminders", methods=["PUT"])
-def send_expiry_reminders():
+# Only one reminder run (scheduled or manual) may be in flight per process
+_reminder_sem = threading.BoundedSemaphore(1)
+
+
+def run_expiry_reminders(req=None):
+    """
+    Runs the reminder pass unless one is already in progress.
+    Returns the number of reminders sent, or None if the run was skipped.
+    """
+    if not _reminder_sem.acquire(blocking=False):
+        print("⏭️ Reminder run already in progress, skipping.")
+        return None
+
+    try:
+        return _run_expiry_reminders(req)
+    finally:
+        _reminder_sem.release()
+
+
+def _run_expiry_reminders(req=None):
     """
     Sends reminders for donations expiring within 24 hours.
 
@@ -727,110 +750,130 @@ def send_expiry_reminders():
         - expired
         - still available
     - Does NOT change status or final_state
-    """
-    try:
-        now = datetime.utcnow()
-        tomorrow = now + timedelta(days=1)
 
-        today_str = now.date().isoformat()
-        tomorrow_str = tomorrow.date().isoformat()
+    Runs outside a request too (the background scheduler calls it inside an
+    app context); returns the number of reminders sent.
+    """
+    now = datetime.utcnow()
+    tomorrow = now + timedelta(days=1)
+
+    today_str = now.date().isoformat()
+    tomorrow_str = tomorrow.date().isoformat()
+
+    print(f"🕒 Checking for donations expiring between {today_str} and {tomorrow_str}")
+
+    # Fetch ALL donations expiring within 24h
+    # (regardless of status / final_state)
+    expiring = (
+        supabase.table("food_donations")
+        .select("id, donor_id, title, expiry_date, status, final_state")
+        .gte("expiry_date", today_str)
+        .lte("expiry_date", tomorrow_str)
+        .execute()
+    )
+
+    if not expiring.data:
+        print("✅ No expiring donations found.")
+        return 0
+
+    count = 0
+    created_at = now.isoformat()
+    messages = []
+
+    for donation in expiring.data:
+        donor_id = donation["donor_id"]
+        title = donation["title"]
+        status = donation.get("status")
+        final_state = donation.get("final_state")
 
-        print(f"🕒 Checking for donations expiring between {today_str} and {tomorrow_str}")
+        # Context-aware message
+        if final_state == "expired":
+            message = (
+                f"Your donation '{title}' has expired. "
+                f"It remains in your history for reference."
+            )
+        elif final_state == "cancelled_by_donor":
+            message = (
+                f"Your donation '{title}' was cancelled by you "
+                f"and is approaching its original expiry date."
+            )
+        elif final_state == "cancelled_by_ngo":
+            message = (
+                f"Your donation '{title}' was cancelled by an NGO "
+                f"and is approaching its original expiry date."
+            )
+        else:
+            message = (
+                f"Your donation '{title}' will expire within 24 hours. "
+                f"Please ensure pickup or update the expiry date."
+            )
 
-        # Fetch ALL donations expiring within 24h
-        # (regardless of status / final_state)
-        expiring = (
-            supabase.table("food_donations")
-            .select("id, donor_id, title, expiry_date, status, final_state")
-            .gte("expiry_date", today_str)
-            .lte("expiry_date", tomorrow_str)
-            .execute()
-        )
+        # In-app notification
+        supabase.table("notifications").insert({
+            "user_id": donor_id,
+            "title": "⏰ Donation Expiry Reminder",
+            "message": message,
+            "type": "reminder",
+            "read": False,
+            "created_at": created_at,
+        }).execute()
 
-        if not expiring.data:
-            print("✅ No expiring donations found.")
-            return jsonify({"message": "No donations expiring soon."}), 200
+        # Email reminder (best effort)
+        try:
+            donor = (
+                supabase.table("users")
+                .select("email, full_name")
+                .eq("id", donor_id)
+                .single()
+                .execute()
+            )
 
-        count = 0
-        created_at = now.isoformat()
+            if donor.data and donor.data.get("email"):
+                messages.append(Message(
+                    subject="⏰ Donation Expiry Reminder - FoodShare",
+                    recipients=[donor.data["email"]],
+                    body=(
+                        f"Hi {donor.data.get('full_name', 'Donor')},\n\n"
+                        f"{message}\n\n"
+                        f"This notification is for your reference only.\n\n"
+                        f"Thank you for supporting FoodShare 🌱\n\n"
+                        f"Warm regards,\n"
+                        f"The FoodShare Team"
+                    ),
+                ))
 
-        for donation in expiring.data:
-            donor_id = donation["donor_id"]
-            title = donation["title"]
-            status = donation.get("status")
-            final_state = donation.get("final_state")
+        except Exception as email_err:
+            print(f"⚠️ Email preparation failed for donation '{title}':", email_err)
 
-            # Context-aware message
-            if final_state == "expired":
-                message = (
-                    f"Your donation '{title}' has expired. "
-                    f"It remains in your history for reference."
-                )
-            elif final_state == "cancelled_by_donor":
-                message = (
-                    f"Your donation '{title}' was cancelled by you "
-                    f"and is approaching its original expiry date."
-                )
-            elif final_state == "cancelled_by_ngo":
-                message = (
-                    f"Your donation '{title}' was cancelled by an NGO "
-                    f"and is approaching its original expiry date."
-                )
-            else:
-                message = (
-                    f"Your donation '{title}' will expire within 24 hours. "
-                    f"Please ensure pickup or update the expiry date."
-                )
+        count += 1
 
-            # In-app notification
-            supabase.table("notifications").insert({
-                "user_id": donor_id,
-                "title": "⏰ Donation Expiry Reminder",
-                "message": message,
-                "type": "reminder",
-                "read": False,
-                "created_at": created_at,
-            }).execute()
+    # Email reminders (best effort, delivered in the background over one
+    # SMTP session for the whole batch)
+    if messages:
+        send_async(*messages)
+        print(f"📩 {len(messages)} reminder emails queued")
 
-            # Email reminder (best effort)
-            try:
-                donor = (
-                    supabase.table("users")
-                    .select("email, full_name")
-                    .eq("id", donor_id)
-                    .single()
-                    .execute()
-                )
+    print(f"✅ {count} reminder notifications sent successfully.")
+    log_audit(
+        "expiry_reminders_sent",
+        user_role="system",
+        entity_type="donation",
+        metadata={"reminder_count": count},
+        req=req,
+    )
+    return count
 
-                if donor.data and donor.data.get("email"):
-                    msg = Message(
-                        subject="⏰ Donation Expiry Reminder - FoodShare",
-                        recipients=[donor.data["email"]],
-                        body=(
-                            f"Hi {donor.data.get('full_name', 'Donor')},\n\n"
-                            f"{message}\n\n"
-                            f"This notification is for your reference only.\n\n"
-                            f"Thank you for supporting FoodShare 🌱\n\n"
-                            f"Warm regards,\n"
-                            f"The FoodShare Team"
-                        ),
-                    )
-                    mail.send(msg)
-                    print(f"📩 Reminder email sent to {donor.data['email']}")
 
-            except Exception as email_err:
-                print(f"⚠️ Email sending failed for donation '{title}':", email_err)
+@donation_bp.route("/donations/send-reminders", methods=["PUT"])
+def send_expiry_reminders():
+    try:
+        count = run_expiry_reminders(req=request)
+        if count is None:
+            return jsonify({"error": "Reminder run already in progress."}), 409
 
-            count += 1
+        if not count:
+            return jsonify({"message": "No donations expiring soon."}), 200
 
-        print(f"✅ {count} reminder notifications sent successfully.")
-        log_audit(
-            "expiry_reminders_sent",
-            user_role="system",
-            entity_type="donation",
-            metadata={"reminder_count": count},
-            req=request,
-        )
         return jsonify({
             "message": f"{count} reminder notifications sent."
         }), 200
@@ -898,7 +941,7 @@ def confirm_pickup(donation_id):
                 {"Content-Type": "text/html"},
             )
 
-        now = datetime.utcnow().isoformat()
+        now = utc_now_iso()
 
 
         # Mark donation as COMPLETED
@@ -975,7 +1018,7 @@ def confirm_pickup(donation_id):
                         f"The FoodShare Team"
                     ),
                 )
-                mail.send(msg)
+                send_async(msg)
 
         except Exception as email_err:
             print("⚠️ Email sending failed (pickup confirm):", email_err)
@@ -1165,7 +1208,7 @@ def ngo_cancel_claim(donation_id):
 
         ngo_id = requested_ngo_id if payload.get("role") == "admin" else payload.get("user_id")
 
-        now = datetime.utcnow().isoformat()
+        now = utc_now_iso()
 
         # Fetch CLAIMED NGO claim (NOT active)
         claim_res = (
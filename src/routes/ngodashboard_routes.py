@@ -1,24 +1,17 @@
-import os
-import os
 import traceback
 import time
-from flask import Blueprint, current_app, request, jsonify
+from flask import Blueprint, current_app, request, jsonify, render_template
 from datetime import datetime, timedelta, date
-from supabase import create_client
+from types import MappingProxyType
 from flask_mail import Message
+from src.services.supabase_service import supabase
 from src.utils.audit_log import log_audit
 from src.utils.jwt import decode_request_token
-from src.utils.mail_instance import mail
+from src.utils.helpers import ojson, utc_now_iso
+from src.utils.mail_queue import send_async
 
 ngo_dashboard_bp = Blueprint("ngo_dashboard", __name__)
 
-SUPABASE_URL = os.getenv("SUPABASE_URL")
-SUPABASE_KEY = os.getenv("SUPABASE_KEY")
-
-supabase = create_client(
-    SUPABASE_URL,
-    SUPABASE_KEY
-)
 
 # Helpers
 def log(title, data=None):
@@ -72,25 +65,15 @@ def _send_claim_confirmation_email(ngo_id, donation_id, donation, claimed_at_iso
         subject="FoodShare Claim Confirmation - Show This at Pickup",
         recipients=[ngo_email],
     )
-    msg.body = f"""
-Hello {ngo_name},
-
-This email confirms that your organization has successfully claimed the donation "{donation_title}" on FoodShare.
-
-When you go to collect the donation, please show this email to the donor as proof that your NGO is the one assigned to the pickup.
-
-Claim details:
-- Donation: {donation_title}
-- Pickup location: {pickup_address}
-- Claimed at: {claimed_at_iso}
-- Claim reference: {donation_id}
-
-Thank you for helping reduce food waste.
-
-Warm regards,
-FoodShare Team
-"""
-    mail.send(msg)
+    msg.body = render_template(
+        "email/claim_confirmation.txt",
+        ngo_name=ngo_name,
+        donation_title=donation_title,
+        pickup_address=pickup_address,
+        claimed_at=claimed_at_iso,
+        donation_id=donation_id,
+    )
+    send_async(msg)
 
 
 def _require_ngo_payload(ngo_id: str | None = None):
@@ -282,7 +265,7 @@ def ngo_dashboard():
             "completed": len(completed),
         })
 
-        return jsonify(result), 200
+        return ojson(result)
 
     except Exception as e:
         print("\n🔥 NGO DASHBOARD CRASH 🔥")
@@ -336,7 +319,7 @@ def claim_donation(donation_id):
         if expiry and expiry <= date.today():
             return jsonify({"error": "Donation has expired"}), 409
 
-        now = datetime.utcnow().isoformat()
+        now = utc_now_iso()
 
         # Create NGO claim (source of truth)
         payload = {
@@ -536,7 +519,7 @@ def ngo_claims_history():
                 "cancelled_at": c.get("cancelled_at"),
             })
 
-        return jsonify({"data": history}), 200
+        return ojson({"data": history})
 
     except Exception as e:
         print("\n🔥 NGO CLAIMS HISTORY ERROR 🔥")
@@ -546,6 +529,37 @@ def ngo_claims_history():
 
 # NGO IMPACT ANALYTICS
 
+def _with_category_slugs(factors):
+    """Also key each factor by the stored category slug ("Prepared Food" -> "prepared_food")."""
+    return MappingProxyType({
+        **factors,
+        **{name.lower().replace(" ", "_"): kg for name, kg in factors.items()},
+    })
+
+
+# UNIT KG CONVERSION (BACKEND source of truth)
+PIECE_TO_KG = _with_category_slugs({
+    "Fruits": 0.18,
+    "Vegetables": 0.25,
+    "Meat": 0.30,
+    "Dairy": 0.50,
+    "Grains": 0.40,
+    "Prepared Food": 0.40,
+})
+
+LITER_TO_KG = _with_category_slugs({
+    "Dairy": 1.03,
+    "Prepared Food": 1.00,
+})
+
+BOX_TO_KG = _with_category_slugs({
+    "Fruits": 5.0,
+    "Vegetables": 6.0,
+    "Meat": 10.0,
+    "Dairy": 8.0,
+    "Prepared Food": 7.0,
+})
+
 
 
 
@@ -558,29 +572,6 @@ def ngo_impact():
             return auth_error
         ngo_id = requested_ngo_id if payload.get("role") == "admin" else payload.get("user_id")
 
-        # UNIT KG CONVERSION (BACKEND source of truth)
-        PIECE_TO_KG = {
-            "Fruits": 0.18,
-            "Vegetables": 0.25,
-            "Meat": 0.30,
-            "Dairy": 0.50,
-            "Grains": 0.40,
-            "Prepared Food": 0.40,
-        }
-
-        LITER_TO_KG = {
-            "Dairy": 1.03,
-            "Prepared Food": 1.00,
-        }
-
-        BOX_TO_KG = {
-            "Fruits": 5.0,
-            "Vegetables": 6.0,
-            "Meat": 10.0,
-            "Dairy": 8.0,
-            "Prepared Food": 7.0,
-        }
-
         def convert_to_kg(qty, unit, category):
             try:
                 qty = float(qty)
@@ -1,8 +1,15 @@
 from flask import Blueprint, jsonify, request
+from src.utils.helpers import ojson, raw_json
 from src.services.supabase_service import supabase
-import traceback
+import logging
+import orjson
 
 notifications_bp = Blueprint("notifications", __name__)
+logger = logging.getLogger(__name__)
+
+# Constant success bodies, serialized once at import
+_ALL_READ_BODY = orjson.dumps({"message": "✅ All notifications marked as read"})
+_ONE_READ_BODY = orjson.dumps({"message": "Notification marked as read"})
 
 # Get all notifications for a specific user
 # GET /api/notifications/<user_id>
@@ -23,11 +30,10 @@ def get_notifications(user_id):
         if hasattr(result, "error") and result.error:
             return jsonify({"error": result.error.message}), 500
 
-        return jsonify({"data": result.data}), 200
+        return ojson({"data": result.data})
 
     except Exception as e:
-        print("⚠️ Notification fetch error:", e)
-        traceback.print_exc()
+        logger.exception("Notification fetch error")
         return jsonify({"error": str(e)}), 500
 
 
@@ -50,11 +56,10 @@ def mark_all_as_read(user_id):
         if hasattr(result, "error") and result.error:
             return jsonify({"error": result.error.message}), 500
 
-        return jsonify({"message": "✅ All notifications marked as read"}), 200
+        return raw_json(_ALL_READ_BODY)
 
     except Exception as e:
-        print("⚠️ Error marking all as read:", e)
-        traceback.print_exc()
+        logger.exception("Error marking all as read")
         return jsonify({"error": str(e)}), 500
 
 
@@ -76,9 +81,8 @@ def mark_single_as_read(notif_id):
         if hasattr(result, "error") and result.error:
             return jsonify({"error": result.error.message}), 500
 
-        return jsonify({"message": "Notification marked as read"}), 200
+        return raw_json(_ONE_READ_BODY)
 
     except Exception as e:
-        print("⚠️ Error marking notification as read:", e)
-        traceback.print_exc()
+        logger.exception("Error marking notification as read")
         return jsonify({"error": str(e)}), 500
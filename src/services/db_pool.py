@@ -0,0 +1,107 @@
+import os
+import threading
+import zlib
+from contextlib import contextmanager
+
+import psycopg2
+import psycopg2.extensions
+from psycopg2.extras import RealDictCursor
+from psycopg2.pool import ThreadedConnectionPool
+
+# Direct Postgres access for hot auth queries, through Supavisor/PgBouncer in
+# session mode (SUPABASE_DB_URL). When the DSN is not configured callers fall
+# back to PostgREST, so the pool is optional.
+_pool = None
+_pool_lock = threading.Lock()
+
+
+class _Connection(psycopg2.extensions.connection):
+    """Pooled connection that remembers which statements it has PREPAREd."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.prepared = set()
+
+
+def db_enabled() -> bool:
+    return bool(os.getenv("SUPABASE_DB_URL"))
+
+
+def _get_pool() -> ThreadedConnectionPool:
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = ThreadedConnectionPool(
+                    int(os.getenv("DB_POOL_MIN", 2)),
+                    int(os.getenv("DB_POOL_MAX", 10)),
+                    dsn=os.getenv("SUPABASE_DB_URL"),
+                    connection_factory=_Connection,
+                    connect_timeout=int(os.getenv("DB_CONNECT_TIMEOUT", 10)),
+                    # Detect connections the pooler dropped while idle
+                    keepalives=1,
+                    keepalives_idle=30,
+                    keepalives_interval=10,
+                    keepalives_count=3,
+                )
+    return _pool
+
+
+@contextmanager
+def db_cursor():
+    """
+    Borrow a pooled connection and yield a dict cursor. The transaction is
+    committed on success and rolled back on error; broken connections are
+    closed instead of being returned to the pool.
+    """
+    pool = _get_pool()
+    conn = pool.getconn()
+    broken = False
+    try:
+        with conn:
+            with conn.cursor(cursor_factory=RealDictCursor) as cur:
+                yield cur
+    except (psycopg2.OperationalError, psycopg2.InterfaceError):
+        broken = True
+        raise
+    finally:
+        pool.putconn(conn, close=broken or bool(conn.closed))
+
+
+def fetch_one(sql: str, params=()):
+    """
+    First row of `sql` as a dict. Rows are encoded with row_to_json so
+    timestamps, numerics and uuids come back in the same JSON shapes
+    PostgREST returns.
+    """
+    with db_cursor() as cur:
+        cur.execute(f"select row_to_json(t) as row from ({sql}) t limit 1", params)
+        row = cur.fetchone()
+    return row["row"] if row else None
+
+
+def fetch_all(sql: str, params=()):
+    with db_cursor() as cur:
+        cur.execute(f"select row_to_json(t) as row from ({sql}) t", params)
+        rows = cur.fetchall()
+    return [row["row"] for row in rows]
+
+
+def fetch_one_prepared(sql: str, params=()):
+    """
+    Like fetch_one, for hot lookups written with $1-style placeholders. Each
+    connection PREPAREs the statement on first use and afterwards only sends
+    EXECUTE, so Postgres skips parsing and planning. Needs a session-mode
+    pooler (Supavisor port 5432 / PgBouncer session mode).
+    """
+    sql = f"select row_to_json(t) as row from ({sql}) t limit 1"
+    name = f"q_{zlib.crc32(sql.encode()):08x}"
+    placeholders = ", ".join(["%s"] * len(params))
+
+    with db_cursor() as cur:
+        if name not in cur.connection.prepared:
+            cur.execute(f"prepare {name} as {sql}")
+            cur.connection.prepared.add(name)
+        cur.execute(f"execute {name} ({placeholders})" if params else f"execute {name}", params)
+        row = cur.fetchone()
+    return row["row"] if row else None
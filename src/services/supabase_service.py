@@ -1,6 +1,7 @@
 import os
+import httpx
 from dotenv import load_dotenv
-from supabase import create_client, Client
+from supabase import ClientOptions, create_client, Client
 
 # Load the .env file (this must come before reading environment variables)
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -16,5 +17,27 @@ if not SUPABASE_URL:
 if not SUPABASE_KEY:
     raise ValueError("❌ SUPABASE_KEY is missing — check your .env path")
 
+# One pooled HTTP/2 session shared by every PostgREST/Storage call in the process,
+# so requests reuse warm TLS connections instead of handshaking per call.
+# The transport retries failed connection attempts only (never a request that
+# reached PostgREST), so a pooled connection dropped by the server is replaced
+# instead of surfacing as a 500.
+http_client = httpx.Client(
+    transport=httpx.HTTPTransport(
+        http2=True,
+        limits=httpx.Limits(
+            max_keepalive_connections=int(os.getenv("SUPABASE_MAX_KEEPALIVE", 50)),
+            max_connections=int(os.getenv("SUPABASE_MAX_CONNECTIONS", 100)),
+            keepalive_expiry=30,
+        ),
+        retries=int(os.getenv("SUPABASE_CONNECT_RETRIES", 2)),
+    ),
+    timeout=httpx.Timeout(30.0),
+)
+
 # Create Supabase client
-supabase: Client = create_client(SUPABASE_URL, SUPABASE_KEY)
+supabase: Client = create_client(
+    SUPABASE_URL,
+    SUPABASE_KEY,
+    options=ClientOptions(httpx_client=http_client),
+)
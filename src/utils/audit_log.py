@@ -1,5 +1,12 @@
 from __future__ import annotations
 
+import atexit
+import logging
+import os
+import queue
+import threading
+import time
+from datetime import datetime, timezone
 from typing import Any
 
 from flask import Request
@@ -7,6 +14,79 @@ from flask import Request
 from src.services.supabase_service import supabase
 from src.utils.jwt import decode_request_token
 
+logger = logging.getLogger(__name__)
+
+# Audit rows are queued by log_audit() and bulk-inserted by one background
+# thread, so request paths (including auth failures) never wait on this write
+AUDIT_FLUSH_INTERVAL = float(os.getenv("AUDIT_FLUSH_INTERVAL", 0.25))
+AUDIT_BATCH_SIZE = int(os.getenv("AUDIT_BATCH_SIZE", 500))
+
+_queue: queue.SimpleQueue = queue.SimpleQueue()
+_flusher: threading.Thread | None = None
+_flusher_lock = threading.Lock()
+
+
+def _drain(limit: int) -> list[dict]:
+    rows = []
+    while len(rows) < limit:
+        try:
+            rows.append(_queue.get_nowait())
+        except queue.Empty:
+            break
+    return rows
+
+
+def _insert(rows: list[dict]) -> None:
+    # A bulk insert is one statement, so a single bad row or a transient
+    # error fails the whole batch: retry once, then write rows one at a time
+    # so only the rows that really fail are lost (and they are logged).
+    for attempt in range(2):
+        try:
+            supabase.table("audit_logs").insert(rows).execute()
+            return
+        except Exception:
+            if attempt == 0:
+                time.sleep(AUDIT_FLUSH_INTERVAL)
+
+    logger.warning("Audit batch of %d rows failed twice; inserting rows one by one", len(rows))
+    for row in rows:
+        try:
+            supabase.table("audit_logs").insert(row).execute()
+        except Exception:
+            # Audit logging must never break primary request flow.
+            logger.exception("Dropped audit log row: %s", row)
+
+
+def _flush_loop() -> None:
+    while True:
+        rows = [_queue.get()]
+        # Let a batch build up unless one is already waiting
+        if _queue.qsize() < AUDIT_BATCH_SIZE - 1:
+            time.sleep(AUDIT_FLUSH_INTERVAL)
+        rows.extend(_drain(AUDIT_BATCH_SIZE - 1))
+        _insert(rows)
+
+
+def _ensure_flusher() -> None:
+    # Started lazily so each gunicorn worker gets its own thread after fork
+    global _flusher
+    if _flusher is not None and _flusher.is_alive():
+        return
+    with _flusher_lock:
+        if _flusher is None or not _flusher.is_alive():
+            _flusher = threading.Thread(target=_flush_loop, name="audit-flush", daemon=True)
+            _flusher.start()
+
+
+@atexit.register
+def flush_audit_logs() -> None:
+    """Write out whatever is still queued (called at interpreter exit)."""
+    while True:
+        rows = _drain(AUDIT_BATCH_SIZE)
+        if not rows:
+            return
+        _insert(rows)
+
 
 def _extract_ip(req: Request | None) -> str | None:
     if req is None:
@@ -42,8 +122,11 @@ def log_audit(
             "entity_id": entity_id,
             "metadata": metadata or {},
             "ip_address": _extract_ip(req),
+            # Event time, not flush time
+            "created_at": datetime.now(timezone.utc).isoformat(),
         }
-        supabase.table("audit_logs").insert(payload).execute()
+        _queue.put(payload)
+        _ensure_flusher()
     except Exception:
         # Audit logging must never break primary request flow.
         return
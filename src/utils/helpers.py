@@ -0,0 +1,78 @@
+from datetime import date, datetime, timezone
+from decimal import Decimal
+
+import orjson
+from flask import Response, g, has_request_context
+from flask.json.provider import JSONProvider
+from werkzeug.http import http_date
+
+_ORJSON_OPTIONS = orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME
+
+
+def ojson(obj, status: int = 200) -> Response:
+    """JSON response encoded with orjson (bytes out, no stdlib encoder pass)."""
+    return Response(
+        orjson.dumps(obj, option=orjson.OPT_NON_STR_KEYS),
+        status=status,
+        mimetype="application/json",
+    )
+
+
+def _orjson_default(obj):
+    # Same shapes as Flask's default provider: dates as HTTP dates,
+    # Decimals as strings, Markup via __html__
+    if isinstance(obj, date):
+        return http_date(obj)
+    if isinstance(obj, Decimal):
+        return str(obj)
+    if hasattr(obj, "__html__"):
+        return str(obj.__html__())
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+class OrjsonProvider(JSONProvider):
+    """
+    Flask JSON provider backed by orjson, so jsonify() and request.get_json()
+    use the C encoder/decoder. Output matches the default provider except
+    that keys keep their insertion order and are not sorted.
+    """
+
+    def dumps(self, obj, **kwargs) -> str:
+        return orjson.dumps(obj, default=_orjson_default, option=_ORJSON_OPTIONS).decode()
+
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
+
+
+def raw_json(body: bytes, status: int = 200) -> Response:
+    """
+    Response around an already-serialized JSON body (e.g. built once at import).
+    A new Response is returned each call because after_request hooks such as
+    Flask-CORS add headers to it.
+    """
+    return Response(body, status=status, mimetype="application/json")
+
+
+def utc_now() -> datetime:
+    """
+    Current aware UTC time. Inside a request the value is taken once and
+    reused, so every check and write in that request shares one clock read.
+    """
+    if not has_request_context():
+        return datetime.now(timezone.utc)
+
+    now = g.get("now")
+    if now is None:
+        now = g.now = datetime.now(timezone.utc)
+    return now
+
+
+def utc_now_iso() -> str:
+    """utc_now() as ISO-8601 with seconds precision (formatted once per request)."""
+    if not has_request_context():
+        return utc_now().isoformat(timespec="seconds")
+
+    now_iso = g.get("now_iso")
+    if now_iso is None:
+        now_iso = g.now_iso = utc_now().isoformat(timespec="seconds")
+    return now_iso
@@ -1,19 +1,83 @@
+import hashlib
 import jwt
+import orjson
 import os
-from flask import Request
+import threading
+import time
+from cachetools import TTLCache
+from datetime import timedelta
+from flask import Request, g, has_request_context
 
 JWT_SECRET = os.getenv("JWT_SECRET")
 JWT_ALGORITHM = "HS256"
+ACCESS_TOKEN_TTL = timedelta(hours=12)
+_ACCESS_TOKEN_TTL_SECONDS = int(ACCESS_TOKEN_TTL.total_seconds())
+
+# Secret encoded once instead of on every sign/verify
+_JWT_KEY = JWT_SECRET.encode("utf-8") if JWT_SECRET else None
+_JWT_ALGORITHMS = [JWT_ALGORITHM]
+
+# Verified payloads keyed on a digest of the token, so a user's burst of
+# calls (request -> resend -> verify) checks the signature once. Only valid
+# tokens are stored and hits still honour `exp`.
+JWT_CACHE_TTL = int(os.getenv("JWT_CACHE_TTL", 30))
+_decoded_cache = TTLCache(maxsize=10000, ttl=JWT_CACHE_TTL)
+_decoded_lock = threading.Lock()
+
+
+def encode_access_token(claims: dict) -> str:
+    """Sign `claims` as an access token expiring after ACCESS_TOKEN_TTL."""
+    return jwt.encode(
+        # Integer epoch seconds, the form PyJWT would convert a datetime to
+        {**claims, "exp": int(time.time()) + _ACCESS_TOKEN_TTL_SECONDS},
+        _JWT_KEY,
+        algorithm=JWT_ALGORITHM,
+    )
+
+
+class _OrjsonJWT(jwt.PyJWT):
+    """PyJWT decoder that parses the claims with orjson instead of json."""
+
+    def _decode_payload(self, decoded):
+        try:
+            payload = orjson.loads(decoded["payload"])
+        except ValueError as e:
+            raise jwt.DecodeError(f"Invalid payload string: {e}") from e
+        if not isinstance(payload, dict):
+            raise jwt.DecodeError("Invalid payload string: must be a json object")
+        return payload
+
+
+_jwt_decoder = _OrjsonJWT()
+
 
 def decode_jwt(token: str):
     try:
-        return jwt.decode(token, JWT_SECRET, algorithms=[JWT_ALGORITHM])
+        return _jwt_decoder.decode(token, _JWT_KEY, algorithms=_JWT_ALGORITHMS)
     except jwt.ExpiredSignatureError:
         return None
     except jwt.InvalidTokenError:
         return None
 
 
+def cached_decode_jwt(token: str):
+    """decode_jwt with a short process-wide cache of successful decodes."""
+    key = hashlib.sha256(token.encode()).digest()[:16]
+    with _decoded_lock:
+        payload = _decoded_cache.get(key)
+    if payload is not None:
+        exp = payload.get("exp")
+        if exp is None or exp > time.time():
+            return payload
+        return None
+
+    payload = decode_jwt(token)
+    if payload is not None:
+        with _decoded_lock:
+            _decoded_cache[key] = payload
+    return payload
+
+
 def extract_token_from_request(req: Request | None) -> str | None:
     if req is None:
         return None
@@ -32,7 +96,20 @@ def extract_token_from_request(req: Request | None) -> str | None:
 
 
 def decode_request_token(req: Request | None):
+    """
+    Decoded payload of the request's token. Within a request the result is
+    kept on flask.g, so the auth decorator and the handler verify it once.
+    """
     token = extract_token_from_request(req)
     if not token:
         return None
-    return decode_jwt(token)
+    if not has_request_context():
+        return cached_decode_jwt(token)
+
+    cached = g.get("_jwt_payload")
+    if cached is not None and cached[0] == token:
+        return cached[1]
+
+    payload = cached_decode_jwt(token)
+    g._jwt_payload = (token, payload)
+    return payload
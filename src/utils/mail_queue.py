@@ -0,0 +1,63 @@
+import logging
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+from flask import current_app
+
+from src.utils.mail_instance import mail
+
+logger = logging.getLogger(__name__)
+
+# Small shared pool so request handlers never wait on SMTP
+_executor = ThreadPoolExecutor(
+    max_workers=int(os.getenv("MAIL_WORKERS", 2)),
+    thread_name_prefix="mail",
+)
+
+
+def _deliver(app, messages):
+    # Large batches are aborted once a third of them fail, so a broken SMTP
+    # server is not hammered
+    max_failures = len(messages) // 3 if len(messages) >= 30 else None
+    failed = []
+    attempted = 0
+
+    with app.app_context():
+        try:
+            with mail.connect() as conn:
+                for msg in messages:
+                    attempted += 1
+                    try:
+                        conn.send(msg)
+                    except Exception:
+                        failed.append(msg)
+                        logger.exception("Background email to %s failed", msg.recipients)
+                        if max_failures is not None and len(failed) > max_failures:
+                            logger.error("Aborting email batch after %s failures", len(failed))
+                            break
+        except Exception:
+            # Connecting (or closing) the session failed. Nobody reads the
+            # future, so log which recipients did not get their email.
+            unsent = failed + list(messages[attempted:])
+            logger.exception(
+                "SMTP session failed; %s of %s emails not sent (recipients: %s)",
+                len(unsent),
+                len(messages),
+                [msg.recipients for msg in unsent],
+            )
+            return len(messages) - len(unsent)
+
+    return attempted - len(failed)
+
+
+def send_async(*messages):
+    """
+    Queue one or more Flask-Mail messages for delivery on a background thread
+    (sharing one SMTP connection) and return immediately. The returned future
+    resolves to the number of messages sent. Must be called inside an app
+    context.
+    """
+    if not messages:
+        return None
+    app = current_app._get_current_object()
+    return _executor.submit(_deliver, app, messages)
@@ -1,14 +1,57 @@
+import os
 import re
+import threading
+from functools import lru_cache
+
+from werkzeug.security import check_password_hash, generate_password_hash
+
+# Explicit KDF cost for user passwords (werkzeug's method string). The default
+# targets roughly 250ms per hash; tune per host with PASSWORD_HASH_METHOD,
+# e.g. "pbkdf2:sha256:600000".
+PASSWORD_HASH_METHOD = os.getenv("PASSWORD_HASH_METHOD", "scrypt:32768:8:1")
+
+# hashlib's scrypt/pbkdf2 release the GIL, so hashes already run in parallel
+# across request threads; cap how many run at once so a login burst cannot
+# take every worker thread (or 32 MiB of scrypt memory per thread)
+_kdf_slots = threading.BoundedSemaphore(
+    int(os.getenv("PASSWORD_HASH_CONCURRENCY", os.cpu_count() or 2))
+)
+
+
+# Strength rules, compiled once, checked in order before any hashing
+_STRENGTH_RULES = (
+    (re.compile(r"[A-Z]"), "Password must contain at least one uppercase letter"),
+    (re.compile(r"[a-z]"), "Password must contain at least one lowercase letter"),
+    (re.compile(r"[0-9]"), "Password must contain at least one number"),
+    (re.compile(r"[!@#$%^&*(),.?\":{}|<>]"), "Password must contain at least one special character"),
+)
+
 
 def validate_password_strength(password: str) -> str | None:
     if len(password) < 8:
         return "Password must be at least 8 characters"
-    if not re.search(r"[A-Z]", password):
-        return "Password must contain at least one uppercase letter"
-    if not re.search(r"[a-z]", password):
-        return "Password must contain at least one lowercase letter"
-    if not re.search(r"[0-9]", password):
-        return "Password must contain at least one number"
-    if not re.search(r"[!@#$%^&*(),.?\":{}|<>]", password):
-        return "Password must contain at least one special character"
+    for pattern, message in _STRENGTH_RULES:
+        if not pattern.search(password):
+            return message
     return None
+
+
+def hash_password(password: str) -> str:
+    with _kdf_slots:
+        return generate_password_hash(password, method=PASSWORD_HASH_METHOD)
+
+
+def verify_password(password_hash: str, password: str) -> bool:
+    with _kdf_slots:
+        return check_password_hash(password_hash, password)
+
+
+@lru_cache(maxsize=1)
+def _current_method_prefix() -> str:
+    # Normalised method as werkzeug writes it into the hash ("scrypt:32768:8:1")
+    return generate_password_hash("", method=PASSWORD_HASH_METHOD).split("$", 1)[0]
+
+
+def password_needs_rehash(password_hash: str) -> bool:
+    """True when a stored hash was made with a different method or cost."""
+    return (password_hash or "").split("$", 1)[0] != _current_method_prefix()
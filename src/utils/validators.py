@@ -1,4 +1,8 @@
 import re
 
+_EMAIL_RE = re.compile(r"^[^@\s]+@[^@\s]+\.[^@\s]+$")
+
+
 def is_valid_email(email: str) -> bool:
-    return re.match(r"^[^@\s]+@[^@\s]+\.[^@\s]+$", email) is not None
+    # Cheap "@" scan rejects most garbage before the regex runs
+    return bool(email) and "@" in email and _EMAIL_RE.match(email) is not None
@@ -0,0 +1,60 @@
+-- Admin dashboard counters in a single round trip.
+-- Used by GET /api/admin/stats (src/routes/admin_routes.py).
+create or replace function public.admin_dashboard_stats()
+returns table (
+    total_users bigint,
+    active_users bigint,
+    donors bigint,
+    ngos bigint,
+    pending_ngos bigint,
+    total_donations bigint,
+    available_donations bigint,
+    claimed_donations bigint,
+    completed_donations bigint,
+    total_claims bigint,
+    completed_claims bigint
+)
+language sql
+stable
+as $$
+    select
+        u.total_users,
+        u.active_users,
+        u.donors,
+        u.ngos,
+        o.pending_ngos,
+        d.total_donations,
+        d.available_donations,
+        d.claimed_donations,
+        d.completed_donations,
+        c.total_claims,
+        c.completed_claims
+    from
+        (
+            select
+                count(*) as total_users,
+                count(*) filter (where status = 'active') as active_users,
+                count(*) filter (where role = 'donor') as donors,
+                count(*) filter (where role = 'ngo') as ngos
+            from public.users
+        ) u,
+        (
+            select count(*) as pending_ngos
+            from public.organizations
+            where verification_status = 'pending'
+        ) o,
+        (
+            select
+                count(*) as total_donations,
+                count(*) filter (where status = 'available') as available_donations,
+                count(*) filter (where status = 'claimed') as claimed_donations,
+                count(*) filter (where status = 'completed') as completed_donations
+            from public.food_donations
+        ) d,
+        (
+            select
+                count(*) as total_claims,
+                count(*) filter (where status = 'completed') as completed_claims
+            from public.ngo_claims
+        ) c;
+$$;
@@ -0,0 +1,23 @@
+-- Per-user donation / claim counts for the admin users list.
+-- Used by GET /api/admin/users (src/routes/admin_routes.py).
+create or replace function public.user_donation_counts(user_ids uuid[])
+returns table (donor_id uuid, donation_count bigint)
+language sql
+stable
+as $$
+    select d.donor_id, count(*) as donation_count
+    from public.food_donations d
+    where d.donor_id = any(user_ids)
+    group by d.donor_id;
+$$;
+
+create or replace function public.user_claim_counts(ngo_ids uuid[])
+returns table (ngo_id uuid, claim_count bigint)
+language sql
+stable
+as $$
+    select c.ngo_id, count(*) as claim_count
+    from public.ngo_claims c
+    where c.ngo_id = any(ngo_ids)
+    group by c.ngo_id;
+$$;
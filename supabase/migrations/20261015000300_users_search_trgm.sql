@@ -0,0 +1,8 @@
+-- Trigram indexes so the admin users search (ILIKE '%term%') avoids a seq scan.
+create extension if not exists pg_trgm;
+
+create index if not exists users_full_name_trgm_idx
+    on public.users using gin (full_name gin_trgm_ops);
+
+create index if not exists users_email_trgm_idx
+    on public.users using gin (email gin_trgm_ops);
@@ -0,0 +1,89 @@
+-- Approve / reject an NGO application in one transaction:
+-- organization verification status, user status and in-app notification.
+-- result is 'ok', 'user_not_found' or 'org_not_found'; email/full_name are
+-- returned for the follow-up email.
+-- Used by PUT /api/admin/ngos/<id>/approve|reject (src/routes/admin_routes.py).
+create or replace function public.approve_ngo(p_user_id uuid)
+returns table (result text, email text, full_name text)
+language plpgsql
+as $$
+declare
+    v_email text;
+    v_full_name text;
+begin
+    select u.email, u.full_name into v_email, v_full_name
+    from public.users u
+    where u.id = p_user_id;
+
+    if not found then
+        return query select 'user_not_found'::text, null::text, null::text;
+        return;
+    end if;
+
+    update public.organizations
+    set verification_status = 'approved'
+    where user_id = p_user_id;
+
+    if not found then
+        return query select 'org_not_found'::text, v_email, v_full_name;
+        return;
+    end if;
+
+    update public.users set status = 'active' where id = p_user_id;
+
+    insert into public.notifications (user_id, title, message, type, read, created_at)
+    values (
+        p_user_id,
+        'NGO Application Approved',
+        'Congratulations! Your organization has been verified. '
+            || 'You can now claim food donations on the platform.',
+        'status_update',
+        false,
+        now()
+    );
+
+    return query select 'ok'::text, v_email, v_full_name;
+end;
+$$;
+
+create or replace function public.reject_ngo(p_user_id uuid, p_reason text)
+returns table (result text, email text, full_name text)
+language plpgsql
+as $$
+declare
+    v_email text;
+    v_full_name text;
+begin
+    select u.email, u.full_name into v_email, v_full_name
+    from public.users u
+    where u.id = p_user_id;
+
+    if not found then
+        return query select 'user_not_found'::text, null::text, null::text;
+        return;
+    end if;
+
+    update public.organizations
+    set verification_status = 'rejected'
+    where user_id = p_user_id;
+
+    if not found then
+        return query select 'org_not_found'::text, v_email, v_full_name;
+        return;
+    end if;
+
+    update public.users set status = 'rejected' where id = p_user_id;
+
+    insert into public.notifications (user_id, title, message, type, read, created_at)
+    values (
+        p_user_id,
+        'NGO Application Not Approved',
+        'Unfortunately, your application was not approved. Reason: ' || p_reason,
+        'status_update',
+        false,
+        now()
+    );
+
+    return query select 'ok'::text, v_email, v_full_name;
+end;
+$$;
@@ -0,0 +1,21 @@
+-- Indexes behind the admin listings (filter + order by created_at desc) and
+-- the per-user count RPCs.
+-- Plain CREATE INDEX because migrations run inside a transaction; for a large
+-- live table run the CONCURRENTLY variant by hand first, these then no-op.
+create index if not exists users_created_at_idx
+    on public.users (created_at desc);
+
+create index if not exists users_role_status_created_at_idx
+    on public.users (role, status, created_at desc);
+
+create index if not exists orgs_verification_created_at_idx
+    on public.organizations (verification_status, created_at desc);
+
+create index if not exists donations_status_created_at_idx
+    on public.food_donations (status, created_at desc);
+
+create index if not exists donations_donor_id_idx
+    on public.food_donations (donor_id);
+
+create index if not exists ngo_claims_ngo_id_idx
+    on public.ngo_claims (ngo_id);
@@ -0,0 +1,67 @@
+-- Precomputed admin dashboard counters.
+-- admin_dashboard_stats() now reads a single materialized row instead of
+-- scanning users / organizations / food_donations / ngo_claims on every call.
+-- The live aggregate is kept as admin_dashboard_stats_live().
+alter function public.admin_dashboard_stats() rename to admin_dashboard_stats_live;
+
+create materialized view if not exists public.admin_stats_mv as
+select 1 as id, s.*
+from public.admin_dashboard_stats_live() s;
+
+-- Required for REFRESH ... CONCURRENTLY (readers are never blocked)
+create unique index if not exists admin_stats_mv_id_idx
+    on public.admin_stats_mv (id);
+
+create or replace function public.refresh_admin_stats()
+returns void
+language sql
+security definer
+as $$
+    refresh materialized view concurrently public.admin_stats_mv;
+$$;
+
+create or replace function public.admin_dashboard_stats()
+returns table (
+    total_users bigint,
+    active_users bigint,
+    donors bigint,
+    ngos bigint,
+    pending_ngos bigint,
+    total_donations bigint,
+    available_donations bigint,
+    claimed_donations bigint,
+    completed_donations bigint,
+    total_claims bigint,
+    completed_claims bigint
+)
+language sql
+stable
+as $$
+    select
+        total_users,
+        active_users,
+        donors,
+        ngos,
+        pending_ngos,
+        total_donations,
+        available_donations,
+        claimed_donations,
+        completed_donations,
+        total_claims,
+        completed_claims
+    from public.admin_stats_mv;
+$$;
+
+-- Background refresh every minute where pg_cron is available; NGO
+-- approve/reject also call refresh_admin_stats() directly.
+do $$
+begin
+    if exists (select 1 from pg_extension where extname = 'pg_cron') then
+        perform cron.schedule(
+            'refresh-admin-stats',
+            '* * * * *',
+            'select public.refresh_admin_stats()'
+        );
+    end if;
+end;
+$$;
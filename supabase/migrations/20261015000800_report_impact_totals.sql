@@ -0,0 +1,57 @@
+-- Platform impact report computed in Postgres: one join + GROUP BY instead of
+-- shipping every completed claim and donation to the API.
+-- Factors mirror PIECE_TO_KG / UNIT_TO_KG in src/routes/admin_routes.py.
+create or replace function public.unit_to_kg(p_unit text, p_category text)
+returns numeric
+language sql
+immutable
+as $$
+    select case lower(coalesce(p_unit, ''))
+        when 'kg' then 1.0
+        when 'liters' then 1.0
+        when 'boxes' then 5.0
+        when 'pieces' then
+            case replace(lower(coalesce(p_category, '')), ' ', '_')
+                when 'fruits' then 0.18
+                when 'vegetables' then 0.25
+                when 'meat' then 0.30
+                when 'dairy' then 0.50
+                when 'grains' then 0.40
+                when 'prepared_food' then 0.40
+                else 0.25
+            end
+        else 0.0
+    end;
+$$;
+
+create or replace function public.report_impact_totals()
+returns json
+language sql
+stable
+as $$
+    with per_category as (
+        select
+            coalesce(d.category, 'Other') as category,
+            sum(coalesce(d.quantity, 0)::numeric * public.unit_to_kg(d.unit, d.category)) as kg
+        from public.ngo_claims c
+        join public.food_donations d on d.id = c.donation_id
+        where c.status = 'completed'
+        group by coalesce(d.category, 'Other')
+    ),
+    totals as (
+        select coalesce(sum(kg), 0) as total_kg from per_category
+    )
+    select json_build_object(
+        'total_food_saved_kg', round(t.total_kg, 2),
+        'co2_avoided_kg', round(t.total_kg * 2.5, 2),
+        'water_saved_liters', round(t.total_kg * 1000, 2),
+        'completed_donations', (
+            select count(*) from public.ngo_claims where status = 'completed'
+        ),
+        'category_breakdown', coalesce(
+            (select json_object_agg(category, round(kg, 2)) from per_category),
+            '{}'::json
+        )
+    )
+    from totals t;
+$$;
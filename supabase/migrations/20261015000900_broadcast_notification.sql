@@ -0,0 +1,26 @@
+-- Fan a broadcast out to every active user (optionally one role) with a
+-- single INSERT ... SELECT, so no recipient rows cross the wire.
+-- Returns the number of notifications written.
+-- Used by POST /api/admin/notifications/broadcast (src/routes/admin_routes.py).
+create or replace function public.broadcast_notification(
+    p_title text,
+    p_message text,
+    p_role text default null,
+    p_created_at timestamptz default now()
+)
+returns integer
+language plpgsql
+as $$
+declare
+    v_count integer;
+begin
+    insert into public.notifications (user_id, title, message, type, read, created_at)
+    select u.id, p_title, p_message, 'broadcast', false, p_created_at
+    from public.users u
+    where u.status = 'active'
+      and (p_role is null or u.role = p_role);
+
+    get diagnostics v_count = row_count;
+    return v_count;
+end;
+$$;
@@ -0,0 +1,24 @@
+-- Case-insensitive unique email, and a registration insert that reports a
+-- taken email as a null id instead of a duplicate-key error.
+-- Fails if the table already holds emails differing only by case; merge
+-- those accounts first.
+-- Used by POST /api/register (src/routes/auth_routes.py).
+create unique index if not exists users_email_lower_key
+    on public.users (lower(email));
+
+create or replace function public.register_user_tx(
+    p_email text,
+    p_password_hash text,
+    p_full_name text,
+    p_phone text,
+    p_role text,
+    p_status text
+)
+returns uuid
+language sql
+as $$
+    insert into public.users (email, password_hash, full_name, phone, role, status)
+    values (p_email, p_password_hash, p_full_name, p_phone, p_role, p_status)
+    on conflict ((lower(email))) do nothing
+    returning id;
+$$;
@@ -0,0 +1,34 @@
+-- register_user_tx also creates the pending organization row for NGO
+-- sign-ups, in the same transaction as the user insert.
+-- Used by POST /api/register (src/routes/auth_routes.py).
+drop function if exists public.register_user_tx(text, text, text, text, text, text);
+
+create or replace function public.register_user_tx(
+    p_email text,
+    p_password_hash text,
+    p_full_name text,
+    p_phone text,
+    p_role text,
+    p_status text,
+    p_address text default null,
+    p_description text default null
+)
+returns uuid
+language plpgsql
+as $$
+declare
+    v_user_id uuid;
+begin
+    insert into public.users (email, password_hash, full_name, phone, role, status)
+    values (p_email, p_password_hash, p_full_name, p_phone, p_role, p_status)
+    on conflict ((lower(email))) do nothing
+    returning id into v_user_id;
+
+    if v_user_id is not null and p_role = 'ngo' then
+        insert into public.organizations (user_id, name, address, description, phone, verification_status)
+        values (v_user_id, p_full_name, p_address, p_description, p_phone, 'pending');
+    end if;
+
+    return v_user_id;
+end;
+$$;
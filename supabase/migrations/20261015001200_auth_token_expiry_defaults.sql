@@ -0,0 +1,9 @@
+-- OTP and reset-token timestamps come from the database clock instead of
+-- being formatted by the API and parsed back by Postgres.
+-- Used by the password change / reset flows (src/routes/auth_routes.py).
+alter table public.password_change_codes
+    alter column created_at set default now(),
+    alter column expires_at set default now() + interval '10 minutes';
+
+alter table public.password_resets
+    alter column expires_at set default now() + interval '30 minutes';
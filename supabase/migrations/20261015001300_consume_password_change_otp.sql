@@ -0,0 +1,30 @@
+-- Consume a verified password-change OTP and store the new password hash in
+-- one transaction. The DELETE ... RETURNING makes the code single-use even
+-- under concurrent submits and re-checks expiry on the database clock.
+-- Returns false when the code is gone or expired.
+-- Used by PATCH /api/profile/password/verify (src/routes/auth_routes.py).
+create or replace function public.consume_password_change_otp(
+    p_user_id uuid,
+    p_code_id uuid,
+    p_password_hash text
+)
+returns boolean
+language plpgsql
+as $$
+begin
+    delete from public.password_change_codes
+    where id = p_code_id
+      and user_id = p_user_id
+      and expires_at > now();
+
+    if not found then
+        return false;
+    end if;
+
+    update public.users
+    set password_hash = p_password_hash
+    where id = p_user_id;
+
+    return true;
+end;
+$$;
@@ -0,0 +1,5 @@
+-- Reset tokens are looked up by hash with limit(1); keep the lookup an
+-- index probe and guarantee a hash maps to one row.
+-- Used by POST /api/auth/reset-password (src/routes/auth_routes.py).
+create unique index if not exists password_resets_token_hash_key
+    on public.password_resets (token_hash);
@@ -0,0 +1,25 @@
+-- delete_user_cascade also clears the user's password reset tokens, so
+-- account deletion does not leave rows behind (or trip a foreign key).
+-- Used by DELETE /api/admin/users/<id> (src/routes/admin_routes.py) and
+-- DELETE /api/account/delete (src/routes/auth_routes.py).
+create or replace function public.delete_user_cascade(p_user_id uuid)
+returns uuid
+language plpgsql
+as $$
+declare
+    v_deleted uuid;
+begin
+    update public.food_donations set donor_id = null where donor_id = p_user_id;
+
+    delete from public.notifications where user_id = p_user_id;
+    delete from public.password_change_codes where user_id = p_user_id;
+    delete from public.password_resets where user_id = p_user_id;
+    delete from public.organizations where user_id = p_user_id;
+    delete from public.ngo_claims where ngo_id = p_user_id;
+
+    delete from public.users where id = p_user_id
+    returning id into v_deleted;
+
+    return v_deleted;
+end;
+$$;
@@ -0,0 +1,5 @@
+-- verify_password_change looks the submitted code up by its HMAC instead of
+-- fetching the latest row and comparing in Python.
+-- Used by PATCH /api/profile/password/verify (src/routes/auth_routes.py).
+create index if not exists password_change_codes_user_id_code_hash_idx
+    on public.password_change_codes (user_id, code_hash);
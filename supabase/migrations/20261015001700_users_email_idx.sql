@@ -0,0 +1,13 @@
+-- Login, forgot-password and the login cache look users up with
+-- email = $1, which cannot use the lower(email) expression index from
+-- 20261015001000_register_user_tx.sql; index the column itself too.
+-- password_change_codes needs no (user_id, created_at) index: every query
+-- on it filters by user_id, covered by password_change_codes_user_id_code_hash_idx,
+-- and each user has at most one live code, so the cooldown's
+-- order by created_at sorts a row or two.
+-- (citext on users.email would let one index serve both, at the cost of a
+-- column type change.)
+-- Used by POST /api/login and POST /api/auth/forgot-password
+-- (src/routes/auth_routes.py).
+create index if not exists users_email_idx
+    on public.users (email);
@@ -0,0 +1,100 @@
+-- Lock down the admin stats materialized view and stop serving stale
+-- counters when nothing refreshes it.
+--  * admin_stats_mv and refresh_admin_stats() are only reachable by the
+--    backend's service_role key; anon/authenticated could otherwise read the
+--    view (RLS does not apply to materialized views) or force full scans by
+--    calling /rpc/refresh_admin_stats in a loop.
+--  * The view records when it was refreshed; admin_dashboard_stats() falls
+--    back to the live aggregate once it is older than two minutes (e.g. when
+--    pg_cron is not installed).
+-- Used by GET /api/admin/stats (src/routes/admin_routes.py).
+drop function if exists public.admin_dashboard_stats();
+drop materialized view if exists public.admin_stats_mv;
+
+create materialized view public.admin_stats_mv as
+select 1 as id, now() as refreshed_at, s.*
+from public.admin_dashboard_stats_live() s;
+
+-- Required for REFRESH ... CONCURRENTLY (readers are never blocked)
+create unique index admin_stats_mv_id_idx
+    on public.admin_stats_mv (id);
+
+revoke all on public.admin_stats_mv from public, anon, authenticated;
+grant select on public.admin_stats_mv to service_role;
+
+create or replace function public.refresh_admin_stats()
+returns void
+language sql
+security definer
+set search_path = public, pg_temp
+as $$
+    refresh materialized view concurrently public.admin_stats_mv;
+$$;
+
+revoke execute on function public.refresh_admin_stats() from public, anon, authenticated;
+grant execute on function public.refresh_admin_stats() to service_role;
+
+create or replace function public.admin_dashboard_stats()
+returns table (
+    total_users bigint,
+    active_users bigint,
+    donors bigint,
+    ngos bigint,
+    pending_ngos bigint,
+    total_donations bigint,
+    available_donations bigint,
+    claimed_donations bigint,
+    completed_donations bigint,
+    total_claims bigint,
+    completed_claims bigint
+)
+language plpgsql
+stable
+set search_path = public, pg_temp
+as $$
+begin
+    if exists (
+        select 1 from public.admin_stats_mv
+        where refreshed_at > now() - interval '2 minutes'
+    ) then
+        return query
+        select
+            m.total_users,
+            m.active_users,
+            m.donors,
+            m.ngos,
+            m.pending_ngos,
+            m.total_donations,
+            m.available_donations,
+            m.claimed_donations,
+            m.completed_donations,
+            m.total_claims,
+            m.completed_claims
+        from public.admin_stats_mv m;
+    else
+        return query select * from public.admin_dashboard_stats_live();
+    end if;
+end;
+$$;
+
+revoke execute on function public.admin_dashboard_stats() from public, anon, authenticated;
+grant execute on function public.admin_dashboard_stats() to service_role;
+revoke execute on function public.admin_dashboard_stats_live() from public, anon, authenticated;
+grant execute on function public.admin_dashboard_stats_live() to service_role;
+
+-- Without pg_cron the view is only refreshed on NGO review and ?refresh=1,
+-- and the dashboard reads the live aggregate; say so instead of skipping.
+do $$
+begin
+    if exists (select 1 from pg_extension where extname = 'pg_cron') then
+        perform cron.unschedule(jobid) from cron.job where jobname = 'refresh-admin-stats';
+        perform cron.schedule(
+            'refresh-admin-stats',
+            '* * * * *',
+            'select public.refresh_admin_stats()'
+        );
+    else
+        raise notice 'pg_cron is not installed: admin_stats_mv will not refresh on a schedule; admin_dashboard_stats() serves live counts while the view is stale';
+    end if;
+end;
+$$;